@@ -15,7 +15,6 @@ __json_spec__ = "1.6.2"
 
 import os
 import sys
-import json
 import csv
 import subprocess
 import argparse
@@ -24,18 +23,108 @@ import time
 import datetime
 import rawpy
 import imageio
+import orjson
 import math
+import functools
+import bisect
 import io
 import tempfile
 import shutil
+import signal
+import threading
+import concurrent.futures
+import multiprocessing
+
+# solve-field の標準出力解析用パターン
+# 全項目を1つの名前付きグループ付き選択パターンにまとめ、stdout を1回の走査で解析する
+_RE_SOLVE_OUTPUT = re.compile(
+    r"Field center: \(RA,Dec\) = \((?P<ra>[\d\.-]+), (?P<dec>[\d\.-]+)\) deg"
+    r"|Field rotation angle: up is (?P<orient>[\d\.-]+) degrees"
+    r"|found (?P<stars>\d+) sources"
+    r"|log-odds ratio (?P<conf>[\d\.]+)"
+    r"|Hit/miss: (?P<hm>[\+\-]+)"
+)
+
+# JSONログ書き出しオプション (orjson はインデント幅2のみ対応)
+_JSON_DUMP_OPTS = orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+
+# マッチ星数による評価 (閾値以上で1段階上がる)
+_RATING_THRESHOLDS = (10, 15, 30, 50)
+_RATING_LABELS = ("★☆☆☆☆", "★★☆☆☆", "★★★☆☆", "★★★★☆", "★★★★★")
+
+# RAW現像パラメータ (solve-field 入力用の軽量JPG生成)
+_RAW_POSTPROCESS_PARAMS = {"use_camera_wb": True, "half_size": True}
+
+# 現像済みJPGキャッシュの保持数。超えた分は最終使用が古いものから削除する
+# (/tmp は tmpfs のことが多く、一晩のバッチや latest 監視で際限なく増えないように)。
+# 解決済みの画像も --force での再解析で再利用するため、上限の範囲では残しておく
+_JPG_CACHE_MAX = 8
+# 並列バッチでは他ワーカーが解析中のJPGを消さないよう、最終使用からこの秒数以内のものは
+# 上限を超えていても残す (1枚の解析は全パス合計でも 4 分程度で終わる)
+_JPG_CACHE_MIN_AGE_SEC = 300
+_RE_JPG_CACHE_NAME = re.compile(r"^\d+_\d+_.+\.jpg$")
+
+# 度 -> 分角
+_ARCMIN = 60.0
+
+@functools.lru_cache(maxsize=128)
+def _cos_dec(dec_q):
+    """赤緯 (0.01度単位に丸めた値) の cos。同一セッション中はほぼ同じ赤緯が続くためキャッシュする"""
+    return math.cos(math.radians(dec_q))
+
+# CSVログの標準レイアウト (v1.6.2)
+_CSV_MASTER_HEADER = [
+    "JSON_ver", "Session_ID", "Objective", "Telescope", "Opt", "Filter", 
+    "Camera", "Aperture", "Focal_L", "F_num", "Pixel_Size", "Pixel_Scale",
+    "LocalTime", "UTC_Time", "UTC_Offset", "LST", "UnixTime", "Sf_Exp_t", 
+    "Diff Sf-Exif", "Mode", "Type", "Filename", "SavedDir", "Format", 
+    "FileSize", "Width", "Height", "ISO_Exif", "Exposure_Exif", 
+    "DateTime_Exif", "Model", "Lat_Exif", "Lon_Exif", "Alt_Exif",
+    "RA", "DEC", "RA_HMS", "DEC_DMS", "MT_Status", "Side", "HourAngle",
+    "Site_Name", "Lat_INDI", "Lon_INDI", "Alt_INDI", "TZ_Source",
+    "Temp_Ext_C", "Humidity_pct", "Pressure_hPa", "DewPoint_C", 
+    "Mnt_CPU_Temp_C", "RPi_CPU_Temp_C", "SSE_Version", "Solve_Status", 
+    "Solve_Path", "Solve_Confidence", "Solve_Timestamp", "Solve_RA", 
+    "Solve_DEC", "Solve_Orientation", "Solve_RA_hms", "Solve_DEC_dms", 
+    "Matched_Stars", "Solve_Time_sec", "SF_version", "SF_status", 
+    "SF_timestamp", "SF_stars", "SF_fwhm_med", "SF_fwhm_mean", 
+    "SF_fwhm_std", "SF_ell_med", "SF_ell_mean", "SF_ell_std"
+]
+
+# Legacy column mapping for older CSVs
+_CSV_LEGACY_MAP = {
+    "ISO_Timestamp": "LocalTime",
+    "Timestamp_UTC": "UTC_Time",
+    "Actual_Exp_sec": "Sf_Exp_t",
+    "Exp_Diff_sec": "Diff Sf-Exif",
+    "Shot_Mode": "Mode",
+    "Frame_Type": "Type",
+    "File_Name": "Filename",
+    "ISO": "ISO_Exif",
+    "Shutter_sec": "Exposure_Exif",
+    "RA_deg": "RA",
+    "Dec_deg": "DEC",
+    "Mount_Status": "MT_Status",
+    "Side_Of_Pier": "Side",
+    "LST_HMS": "LST"
+}
+
+# 末尾行の書き換え判定で読み込む末尾バイト数 (1行分が収まれば十分)
+_CSV_TAIL_BYTES = 16384
 
 class SkySolverEngine:
-    def __init__(self, workdir="/tmp/skysolver", all_sky_enabled=False, force_mode=False):
+    def __init__(self, workdir="/tmp/skysolver", all_sky_enabled=False, force_mode=False, cachedir=None,
+                 cache_max=_JPG_CACHE_MAX, parallel_passes=True):
         self.workdir = workdir
+        # 現像済みJPGのキャッシュ先 (並列処理時はプロセス間で共有する)
+        self.cachedir = cachedir or workdir
+        self.cache_max = cache_max
+        # Pass 1-3 を並列に走らせるか (並列バッチのワーカー内では順番に実行する)
+        self.parallel_passes = parallel_passes
         self.all_sky_enabled = all_sky_enabled
         self.force_mode = force_mode
-        if not os.path.exists(self.workdir):
-            os.makedirs(self.workdir)
+        for d in (self.workdir, self.cachedir):
+            os.makedirs(d, exist_ok=True)
 
     def deg_to_hms(self, ra_deg):
         ra_hours = (ra_deg % 360) / 15.0
@@ -53,24 +142,57 @@ class SkySolverEngine:
         return f"{sign}{d:02d}°{m:02d}'{s:02d}\""
 
     def get_star_rating(self, stars):
-        if stars >= 50: return "★★★★★"
-        if stars >= 30: return "★★★★☆"
-        if stars >= 15: return "★★★☆☆"
-        if stars >= 10: return "★★☆☆☆"
-        return "★☆☆☆☆"
+        return _RATING_LABELS[bisect.bisect_right(_RATING_THRESHOLDS, stars or 0)]
 
     def prepare_image(self, image_path):
         if image_path.lower().endswith(('.dng', '.raw')):
-            tmp_jpg = os.path.join(self.workdir, "solve_input.jpg")
+            # 元ファイルの mtime + サイズ + ファイル名を指紋としてJPGをキャッシュし、
+            # 再解析 (--force 等) では rawpy の現像処理をスキップする
+            try:
+                st = os.stat(image_path)
+            except OSError as e:
+                print(f"  [Error] Image conversion failed: {e}"); return None
+            cache_name = f"{st.st_mtime:.0f}_{st.st_size}_{os.path.basename(image_path)}.jpg"
+            tmp_jpg = os.path.join(self.cachedir, cache_name)
+            try:
+                # 最終使用時刻を更新して、eviction で古い順に消されないようにする
+                os.utime(tmp_jpg)
+                return tmp_jpg
+            except FileNotFoundError:
+                pass  # 未作成、または他ワーカーの eviction で消えた -> 現像し直す
+            except OSError:
+                if os.path.exists(tmp_jpg): return tmp_jpg
             try:
                 with rawpy.imread(image_path) as raw:
-                    rgb = raw.postprocess(use_camera_wb=True, half_size=True)
-                    imageio.imsave(tmp_jpg, rgb)
+                    rgb = raw.postprocess(**_RAW_POSTPROCESS_PARAMS)
+                    # 書き込み途中のJPGがキャッシュとして残らないよう一時名で保存してから置換
+                    part_jpg = os.path.join(self.cachedir, f"part_{cache_name}")
+                    imageio.imsave(part_jpg, rgb)
+                    os.replace(part_jpg, tmp_jpg)
+                self._evict_jpg_cache(keep=tmp_jpg)
                 return tmp_jpg
             except Exception as e:
                 print(f"  [Error] Image conversion failed: {e}"); return None
         return image_path
 
+    def _evict_jpg_cache(self, keep):
+        """キャッシュJPGが cache_max 件を超えたら、最終使用 (mtime) が古いものから削除する"""
+        entries = []
+        in_use_after = time.time() - _JPG_CACHE_MIN_AGE_SEC
+        try:
+            with os.scandir(self.cachedir) as it:
+                for e in it:
+                    if _RE_JPG_CACHE_NAME.match(e.name) and e.path != keep:
+                        try: entries.append((e.stat().st_mtime, e.path))
+                        except OSError: pass
+        except OSError:
+            return
+        entries.sort()
+        for mtime, path in entries[:max(0, len(entries) - (self.cache_max - 1))]:
+            if mtime >= in_use_after: break
+            try: os.remove(path)
+            except OSError: pass
+
     def solve(self, image_path, ra_hint=None, dec_hint=None):
         start_time = time.time()
         timestamp = datetime.datetime.now().isoformat(timespec='seconds')
@@ -81,27 +203,87 @@ class SkySolverEngine:
         src = self.prepare_image(image_path)
         if not src: return {"success": False, "duration": 0.0, "timestamp": timestamp}
 
-        base_cmd = ["solve-field", src, "--dir", self.workdir, "--overwrite", "--no-plots",
-                    "--scale-low", "1.0", "--scale-high", "15.0", "--scale-units", "app", "--cpulimit", "20"]
+        # 解決後や他パス成功時に solve-field を途中で止めるため、一時ファイルと
+        # 各パスの出力 (.axy/.corr/.match/.rdls/.solved/.wcs 等) は解析ごとの専用
+        # ディレクトリに置き、最後にまとめて削除する (結果は stdout から読むので不要)
+        sf_tmp = tempfile.mkdtemp(dir=self.workdir, prefix="sf_tmp_")
+        base_cmd = ["solve-field", src, "--dir", sf_tmp, "--overwrite", "--no-plots",
+                    "--scale-low", "1.0", "--scale-high", "15.0", "--scale-units", "app", "--cpulimit", "20",
+                    "--temp-dir", sf_tmp]
+
+        # 抽出済みの星リスト (xylist) を (sigma, ds) ごとに保持し、同一条件のパスでは
+        # solve-field に画像ではなく xylist を渡して星検出処理の再実行を省略する
+        # (xylist も sf_tmp に置き、この画像の全パス終了後にまとめて削除する)
+        xylists = {}
+        src_base = os.path.splitext(os.path.basename(src))[0]
+
+        # 並列実行中の solve-field プロセス (先に成功したパス以外を打ち切るため)
+        running = []
+        cancel = threading.Event()
+
+        def register(proc):
+            running.append(proc)
+            if cancel.is_set(): self._terminate(proc)
 
         def try_solve(pass_label, sigma, ds, extra_args, timeout=25):
             print(f"  [Solve] {pass_label}: (sigma={sigma}, ds={ds})...", end="\r")
-            full_cmd = base_cmd + ["--sigma", str(sigma), "--downsample", str(ds)] + extra_args
-            res_cmd = self._run_solve_cmd(full_cmd, timeout=timeout)
+            # 並列パス同士で --dir 内の出力ファイルが衝突しないよう sigma ごとに出力名を分ける
+            out_args = ["--out", f"{src_base}_s{sigma}"]
+            cached = xylists.get((sigma, ds))
+            if cached:
+                xyls_path, n_sources = cached
+                full_cmd = ["solve-field", xyls_path] + base_cmd[2:] + out_args + extra_args
+            else:
+                xyls_path = os.path.join(sf_tmp, f"{src_base}_s{sigma}_d{ds}.xyls")
+                if os.path.exists(xyls_path): os.remove(xyls_path)
+                full_cmd = base_cmd + out_args + ["--sigma", str(sigma), "--downsample", str(ds),
+                                                  "--keep-xylist", xyls_path] + extra_args
+            res_cmd = self._run_solve_cmd(full_cmd, timeout=timeout, on_start=register)
+            if not cached and os.path.exists(xyls_path):
+                xylists[(sigma, ds)] = (xyls_path, res_cmd.get("stars"))
+            elif cached and res_cmd["success"] and res_cmd.get("stars") is None:
+                # xylist 入力時は星検出ログが出力されないため、抽出時の検出数を引き継ぐ
+                res_cmd["stars"] = n_sources
             if res_cmd["success"]:
                 res_cmd["solve_path"] = pass_label
                 print(f"  [Match] {res_cmd.get('hitmiss', '')} [SUCCESS!]")
             return res_cmd
 
+        try:
+            res = self._run_passes(try_solve, running, cancel, ra_hint, dec_hint)
+        finally:
+            shutil.rmtree(sf_tmp, ignore_errors=True)
+
+        res["duration"] = round(time.time() - start_time, 2)
+        res["timestamp"] = timestamp
+        res["sse_version"] = __version__
+        return res
+
+    def _run_passes(self, try_solve, running, cancel, ra_hint, dec_hint):
         res = {"success": False}
         hint_args = ["--ra", str(ra_hint), "--dec", str(dec_hint), "--radius", "10.0"] if ra_hint is not None else []
 
         if hint_args:
-            res = try_solve("Pass 1", sigma=30, ds=4, extra_args=hint_args + ["--objs", "100"], timeout=25)
-            if not res["success"]:
-                res = try_solve("Pass 2", sigma=15, ds=4, extra_args=hint_args + ["--objs", "150"], timeout=25)
-            if not res["success"]:
-                res = try_solve("Pass 3", sigma=10, ds=4, extra_args=hint_args + ["--objs", "300"], timeout=30)
+            # Pass 1-3 は並列に実行し、最初に成功したパスを採用して残りを打ち切る。
+            # --cpulimit は各プロセスのCPU秒の上限でありコア数の制限ではないため、3本が同時に
+            # CPUを取り合う。並列バッチ (--jobs) のワーカー内では 3×N 本が固定のタイムアウトで
+            # 競合して偽の失敗になるので、parallel_passes=False で順番に実行する
+            hint_passes = [("Pass 1", 30, "100", 25), ("Pass 2", 15, "150", 25), ("Pass 3", 10, "300", 30)]
+            if self.parallel_passes:
+                with concurrent.futures.ThreadPoolExecutor(max_workers=len(hint_passes)) as pool:
+                    futures = [pool.submit(try_solve, label, sigma=sigma, ds=4, extra_args=hint_args + ["--objs", objs], timeout=tmo)
+                               for label, sigma, objs, tmo in hint_passes]
+                    for fut in concurrent.futures.as_completed(futures):
+                        r = fut.result()
+                        if r["success"]:
+                            res = r
+                            cancel.set()
+                            for proc in running: self._terminate(proc)
+                            break
+            else:
+                for label, sigma, objs, tmo in hint_passes:
+                    res = try_solve(label, sigma=sigma, ds=4, extra_args=hint_args + ["--objs", objs], timeout=tmo)
+                    if res["success"]: break
             if not res["success"]:
                 res = try_solve("Pass 4", sigma=5, ds=4, extra_args=hint_args + ["--objs", "500"], timeout=30)
 
@@ -113,33 +295,71 @@ class SkySolverEngine:
                 res = try_solve("AllSky 3", sigma=10, ds=4, extra_args=["--objs", "300"], timeout=60)
             if not res["success"]:
                 res = try_solve("AllSky 4", sigma=5, ds=4, extra_args=["--objs", "500"], timeout=60)
-
-        res["duration"] = round(time.time() - start_time, 2)
-        res["timestamp"] = timestamp
-        res["sse_version"] = __version__
         return res
 
-    def _run_solve_cmd(self, cmd, timeout):
+    def _terminate(self, proc):
+        """solve-field とその子プロセス (astrometry-engine 等) をまとめて停止する"""
+        if proc.poll() is None:
+            try: os.killpg(proc.pid, signal.SIGTERM)
+            except OSError: pass
+
+    def _run_solve_cmd(self, cmd, timeout, on_start=None):
         try:
-            res = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
-            if "Field 1: solved" in res.stdout:
-                m_coord = re.search(r"Field center: \(RA,Dec\) = \(([\d\.-]+), ([\d\.-]+)\) deg", res.stdout)
-                m_orient = re.search(r"Field rotation angle: up is ([\d\.-]+) degrees", res.stdout)
-                m_stars = re.search(r"found (\d+) sources", res.stdout)
-                m_conf = re.search(r"log-odds ratio ([\d\.]+)", res.stdout)
-                m_hm = re.search(r"Hit/miss: ([\+\-]+)", res.stdout)
-                
+            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+                                    bufsize=1, start_new_session=True)
+            if on_start: on_start(proc)
+            # 出力を1行ずつ読むため、タイムアウトはタイマーでプロセスを止めて stdout を閉じさせる
+            timed_out = threading.Event()
+            def on_timeout():
+                timed_out.set()
+                self._terminate(proc)
+            timer = threading.Timer(timeout, on_timeout)
+            timer.start()
+            found = {}
+            solved = False
+            try:
+                for line in proc.stdout:
+                    # 各項目は最初の出現値を採用する (従来の re.search と同じ挙動)
+                    for m in _RE_SOLVE_OUTPUT.finditer(line):
+                        for key, val in m.groupdict().items():
+                            if val is not None and key not in found:
+                                found[key] = val
+                    if "Field 1: solved" in line:
+                        solved = True
+                    # 中心座標と回転角は解決報告の後に出力される。揃った時点で
+                    # 以降の新FITS作成等の後処理を待たずに打ち切る
+                    if solved and "ra" in found and "orient" in found:
+                        break
+                    if "Did not solve" in line:
+                        break
+            finally:
+                timer.cancel()
+                self._terminate(proc)
+                proc.stdout.close()
+                try:
+                    proc.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    # SIGTERM に応じない場合は強制終了して CPU を次のパスへ回す
+                    try: os.killpg(proc.pid, signal.SIGKILL)
+                    except OSError: pass
+                    proc.wait()
+            stars = int(found["stars"]) if "stars" in found else None
+
+            if solved and not timed_out.is_set():
                 return {
                     "success": True, 
-                    "ra": float(m_coord.group(1)) if m_coord else 0.0, 
-                    "dec": float(m_coord.group(2)) if m_coord else 0.0,
-                    "orientation": float(m_orient.group(1)) if m_orient else None,
-                    "stars": int(m_stars.group(1)) if m_stars else None,
-                    "confidence": float(m_conf.group(1)) if m_conf else 0.0,
-                    "hitmiss": m_hm.group(1)[:15] if m_hm else "" 
+                    "ra": float(found["ra"]) if "ra" in found else 0.0, 
+                    "dec": float(found["dec"]) if "dec" in found else 0.0,
+                    "orientation": float(found["orient"]) if "orient" in found else None,
+                    "stars": stars,
+                    "confidence": float(found["conf"]) if "conf" in found else 0.0,
+                    "hitmiss": found["hm"][:15] if "hm" in found else "" 
                 }
+            if timed_out.is_set(): return {"success": False}
+            return {"success": False, "stars": stars}
+        except (OSError, ValueError) as e:
+            print(f"  [Error] solve-field run failed: {e}")
             return {"success": False}
-        except Exception: return {"success": False}
 
     def print_dashboard(self, res, ra_hint, dec_hint):
         print(f"\n-----------------[ ANALYSIS REPORT ]-----------------")
@@ -155,39 +375,61 @@ class SkySolverEngine:
             print(f" Rotation: {res.get('orientation', 0.0):.2f}° (E of N)")
             
             if ra_hint is not None:
-                dra = res['ra'] - ra_hint
+                # RA 0h/24h をまたぐ場合も最短方向の差にする
+                dra = (res['ra'] - ra_hint + 180.0) % 360.0 - 180.0
                 ddec = res['dec'] - dec_hint
-                dist = math.sqrt((dra * math.cos(math.radians(dec_hint)))**2 + ddec**2) * 60
+                dist = math.hypot(dra * _cos_dec(round(dec_hint, 2)), ddec) * _ARCMIN
                 print(f"-----------------------------------------------------")
                 print(f" Mount Drift (Offset):")
                 print(f"  ΔRA: {dra:+.3f}° / ΔDec: {ddec:+.3f}°")
                 print(f"  Total Dist: {dist:.1f}' {'[ Excellent ]' if dist < 5 else '[ Need Sync ]'}")
         print(f"-----------------------------------------------------\n")
 
-    def update_logs(self, img_path, res):
+    def update_logs(self, img_path, res, preloaded=None):
         img_dir = os.path.dirname(os.path.abspath(img_path))
         img_name = os.path.basename(img_path)
         h_path = os.path.join(img_dir, "shutter_log.json")
-        if os.path.exists(h_path): self._update_json_file(h_path, img_name, res)
+        if os.path.exists(h_path): self._update_json_file(h_path, img_name, res, preloaded=preloaded)
         csv_path = os.path.join(img_dir, "shutter_log.csv")
         if os.path.exists(csv_path): self._update_csv_file(csv_path, img_name, res)
 
-    def _update_json_file(self, filepath, target_filename, res):
+    def _load_log(self, filepath):
+        """shutter_log.json を読み込み、(stat 指紋, データ, 索引) を返す"""
+        with open(filepath, 'rb') as f:
+            st = os.fstat(f.fileno())
+            data = orjson.loads(f.read())
+        return (st.st_mtime_ns, st.st_size), data, self._index_log(data)
+
+    def _index_log(self, data):
+        """shutter_log.json のレコード一覧からファイル名 -> レコードリストの索引を作る"""
+        index = {}
+        for entry in data:
+            name = entry.get("record", {}).get("file", {}).get("name", "")
+            if name: index.setdefault(name, []).append(entry)
+        return index
+
+    def _find_log_entries(self, index, target_filename):
+        """完全一致を優先し、無ければファイル名の部分一致 (日付プレフィックス付き等) で探す"""
+        entries = index.get(target_filename)
+        if entries: return entries
+        return [e for name, lst in index.items() if name in target_filename for e in lst]
+
+    def _update_json_file(self, filepath, target_filename, res, preloaded=None):
         temp_fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(filepath), prefix="sse_tmp_", suffix=".json")
         try:
-            updated = False
-            with open(filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                for entry in data:
-                    # check if name matches or is part of target
-                    name = entry.get("record", {}).get("file", {}).get("name", "")
-                    if name and (name == target_filename or name in target_filename):
-                        self._apply_res_to_dict(entry, res)
-                        updated = True
+            # 解析中に ShutterPro03 が追記していなければ process_target で読んだ内容を再利用する
+            if preloaded is not None:
+                st = os.stat(filepath)
+                if preloaded[0] != (st.st_mtime_ns, st.st_size): preloaded = None
+            _, data, index = preloaded if preloaded is not None else self._load_log(filepath)
+            # check if name matches or is part of target
+            entries = self._find_log_entries(index, target_filename)
+            for entry in entries:
+                self._apply_res_to_dict(entry, res)
             
-            if updated:
-                with os.fdopen(temp_fd, 'w', encoding='utf-8') as tmp:
-                    json.dump(data, tmp, indent=4, ensure_ascii=False)
+            if entries:
+                with os.fdopen(temp_fd, 'wb') as tmp:
+                    tmp.write(orjson.dumps(data, option=_JSON_DUMP_OPTS))
                 os.replace(temp_path, filepath)
             else:
                 os.close(temp_fd)
@@ -195,7 +437,7 @@ class SkySolverEngine:
         except Exception as e:
             if 'temp_path' in locals() and os.path.exists(temp_path): 
                 try: os.close(temp_fd)
-                except: pass
+                except OSError: pass
                 os.remove(temp_path)
             print(f"  [Warning] JSON Update Failed: {e}")
 
@@ -219,47 +461,68 @@ class SkySolverEngine:
             }
         target_dict["analysis"]["SSE"] = sse_data
 
+    def _apply_res_to_row(self, new_row, res):
+        new_row["Solve_Status"] = "success" if res["success"] else "failed"
+        new_row["Solve_Path"] = res.get("solve_path", "N/A")
+        new_row["Solve_Time_sec"] = str(res.get("duration", 0.0))
+        new_row["Solve_Confidence"] = f"{res.get('confidence', 0.0):.2f}"
+        new_row["SSE_Version"] = __version__
+        new_row["Solve_Timestamp"] = res.get("timestamp", "")
+        if res["success"]:
+            new_row["Solve_RA"] = f"{res['ra']:.8f}"
+            new_row["Solve_DEC"] = f"{res['dec']:.8f}"
+            new_row["Solve_RA_hms"] = self.deg_to_hms(res['ra'])
+            new_row["Solve_DEC_dms"] = self.deg_to_dms(res['dec'])
+            new_row["Matched_Stars"] = str(res.get("stars", ""))
+            orient = res.get("orientation")
+            new_row["Solve_Orientation"] = f"{orient:.2f}" if orient is not None else "0.00"
+
+    def _update_csv_tail(self, filepath, target_filename, res):
+        """対象が最終行ならその1行だけをその場で書き換える。書き換えできなければ False を返す"""
+        with open(filepath, 'r+b') as f:
+            header = None
+            for raw in f:
+                line = raw.decode('utf-8-sig').strip()
+                if line and not line.startswith("#"):
+                    header = next(csv.reader([line]))
+                    break
+            # 旧レイアウトの移行が必要なファイルは全体書き換えに回す
+            if header != _CSV_MASTER_HEADER: return False
+
+            size = f.seek(0, os.SEEK_END)
+            tail_len = min(size, _CSV_TAIL_BYTES)
+            f.seek(size - tail_len)
+            tail = f.read(tail_len).rstrip(b"\r\n")
+            start = tail.rfind(b"\n") + 1
+            if start == 0: return False
+            row = next(csv.reader([tail[start:].decode('utf-8')]), None)
+            if not row or len(row) != len(header): return False
+
+            new_row = dict(zip(header, row))
+            csv_filename = new_row["Filename"]
+            if not csv_filename or not (csv_filename == target_filename or csv_filename in target_filename):
+                return False
+            self._apply_res_to_row(new_row, res)
+            buf = io.StringIO()
+            csv.DictWriter(buf, fieldnames=header).writerow(new_row)
+
+            # 読み込み後に ShutterPro03 が追記していたら全体書き換えに任せる
+            if os.fstat(f.fileno()).st_size != size: return False
+            f.seek(size - tail_len + start)
+            f.write(buf.getvalue().encode('utf-8'))
+            f.truncate()
+        return True
+
     def _update_csv_file(self, filepath, target_filename, res):
         """Streaming update for CSV with forced v1.6.2 layout."""
+        # 通常は直前に撮影した最終行の更新なので、その1行だけを書き換える
+        try:
+            if self._update_csv_tail(filepath, target_filename, res): return
+        except (OSError, UnicodeDecodeError, csv.Error):
+            pass
         temp_fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(filepath), prefix="sse_tmp_", suffix=".csv")
         try:
             seen_comments = set()
-            master_header = [
-                "JSON_ver", "Session_ID", "Objective", "Telescope", "Opt", "Filter", 
-                "Camera", "Aperture", "Focal_L", "F_num", "Pixel_Size", "Pixel_Scale",
-                "LocalTime", "UTC_Time", "UTC_Offset", "LST", "UnixTime", "Sf_Exp_t", 
-                "Diff Sf-Exif", "Mode", "Type", "Filename", "SavedDir", "Format", 
-                "FileSize", "Width", "Height", "ISO_Exif", "Exposure_Exif", 
-                "DateTime_Exif", "Model", "Lat_Exif", "Lon_Exif", "Alt_Exif",
-                "RA", "DEC", "RA_HMS", "DEC_DMS", "MT_Status", "Side", "HourAngle",
-                "Site_Name", "Lat_INDI", "Lon_INDI", "Alt_INDI", "TZ_Source",
-                "Temp_Ext_C", "Humidity_pct", "Pressure_hPa", "DewPoint_C", 
-                "Mnt_CPU_Temp_C", "RPi_CPU_Temp_C", "SSE_Version", "Solve_Status", 
-                "Solve_Path", "Solve_Confidence", "Solve_Timestamp", "Solve_RA", 
-                "Solve_DEC", "Solve_Orientation", "Solve_RA_hms", "Solve_DEC_dms", 
-                "Matched_Stars", "Solve_Time_sec", "SF_version", "SF_status", 
-                "SF_timestamp", "SF_stars", "SF_fwhm_med", "SF_fwhm_mean", 
-                "SF_fwhm_std", "SF_ell_med", "SF_ell_mean", "SF_ell_std"
-            ]
-            
-            # Legacy column mapping for older CSVs
-            legacy_map = {
-                "ISO_Timestamp": "LocalTime",
-                "Timestamp_UTC": "UTC_Time",
-                "Actual_Exp_sec": "Sf_Exp_t",
-                "Exp_Diff_sec": "Diff Sf-Exif",
-                "Shot_Mode": "Mode",
-                "Frame_Type": "Type",
-                "File_Name": "Filename",
-                "ISO": "ISO_Exif",
-                "Shutter_sec": "Exposure_Exif",
-                "RA_deg": "RA",
-                "Dec_deg": "DEC",
-                "Mount_Status": "MT_Status",
-                "Side_Of_Pier": "Side",
-                "LST_HMS": "LST"
-            }
-            
             with open(filepath, 'r', encoding='utf-8-sig', newline='') as f_in, \
                  os.fdopen(temp_fd, 'w', encoding='utf-8-sig', newline='') as f_out:
                 
@@ -285,34 +548,21 @@ class SkySolverEngine:
                 reader = csv.DictReader([header_line])
                 actual_reader = csv.DictReader(f_in, fieldnames=reader.fieldnames)
                 
-                writer = csv.DictWriter(f_out, fieldnames=master_header, extrasaction='ignore')
+                writer = csv.DictWriter(f_out, fieldnames=_CSV_MASTER_HEADER, extrasaction='ignore')
                 writer.writeheader()
                 
                 for row in actual_reader:
-                    new_row = {col: row.get(col, "") for col in master_header}
+                    new_row = {col: row.get(col, "") for col in _CSV_MASTER_HEADER}
                     
                     # Apply legacy mapping if needed
-                    for old_k, new_k in legacy_map.items():
+                    for old_k, new_k in _CSV_LEGACY_MAP.items():
                         if old_k in row and not new_row.get(new_k):
                             new_row[new_k] = row[old_k]
                             
                     csv_filename = new_row.get("Filename", "")
                     
                     if csv_filename and (csv_filename == target_filename or csv_filename in target_filename):
-                        new_row["Solve_Status"] = "success" if res["success"] else "failed"
-                        new_row["Solve_Path"] = res.get("solve_path", "N/A")
-                        new_row["Solve_Time_sec"] = str(res.get("duration", 0.0))
-                        new_row["Solve_Confidence"] = f"{res.get('confidence', 0.0):.2f}"
-                        new_row["SSE_Version"] = __version__
-                        new_row["Solve_Timestamp"] = res.get("timestamp", "")
-                        if res["success"]:
-                            new_row["Solve_RA"] = f"{res['ra']:.8f}"
-                            new_row["Solve_DEC"] = f"{res['dec']:.8f}"
-                            new_row["Solve_RA_hms"] = self.deg_to_hms(res['ra'])
-                            new_row["Solve_DEC_dms"] = self.deg_to_dms(res['dec'])
-                            new_row["Matched_Stars"] = str(res.get("stars", ""))
-                            orient = res.get("orientation")
-                            new_row["Solve_Orientation"] = f"{orient:.2f}" if orient is not None else "0.00"
+                        self._apply_res_to_row(new_row, res)
                     
                     writer.writerow(new_row)
             
@@ -320,31 +570,43 @@ class SkySolverEngine:
         except Exception as e:
             if 'temp_path' in locals() and os.path.exists(temp_path):
                 try: os.close(temp_fd)
-                except: pass
+                except OSError: pass
                 os.remove(temp_path)
             print(f"  [Error] CSV Update Failed: {e}")
 
     def process_target(self, target_path):
+        out = self._solve_target(target_path)
+        if out is None: return
+        res, ra_hint, dec_hint, preloaded = out
+        self.print_dashboard(res, ra_hint, dec_hint)
+        self.update_logs(target_path, res, preloaded)
+
+    def _solve_target(self, target_path):
+        """ログからヒントを取得して解析し、(結果, RAヒント, DECヒント, 読込済みログ) を返す。スキップ時は None"""
         target_name = os.path.basename(target_path)
         log_path = os.path.join(os.path.dirname(target_path), "shutter_log.json")
         ra_hint, dec_hint, is_solved = None, None, False
+        preloaded = None
         if os.path.exists(log_path):
             try:
-                with open(log_path, 'r', encoding='utf-8') as f:
-                    for r in json.load(f):
-                        if r["record"]["file"]["name"] in target_name:
-                            analysis = r.get("analysis", {})
-                            is_solved = analysis.get("SSE", {}).get("solve_status") == "success" or analysis.get("solve_status") == "success"
-                            ra_hint = r["record"]["mount"].get("ra_deg")
-                            dec_hint = r["record"]["mount"].get("dec_deg"); break
-            except: pass
+                # ログは一度だけ読み込み、ヒント取得と解析後の書き戻しで共有する
+                preloaded = self._load_log(log_path)
+                entries = self._find_log_entries(preloaded[2], target_name)
+                if entries:
+                    r = entries[0]
+                    analysis = r.get("analysis", {})
+                    is_solved = analysis.get("SSE", {}).get("solve_status") == "success" or analysis.get("solve_status") == "success"
+                    ra_hint = r["record"]["mount"].get("ra_deg")
+                    dec_hint = r["record"]["mount"].get("dec_deg")
+            except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+                # ログが読めない・形式が崩れている場合はヒントなしで解析を続ける
+                print(f"  [Warning] Failed to read hints from log: {e}")
         if is_solved and not self.force_mode:
             print(f"SSE>> Processing [{target_name}]\n  [Skip] Already solved.")
-            return
+            return None
         print(f"SSE>> Processing [{target_name}]{' (RE-SOLVE)' if is_solved else ''}")
         res = self.solve(target_path, ra_hint, dec_hint)
-        self.print_dashboard(res, ra_hint, dec_hint)
-        self.update_logs(target_path, res)
+        return res, ra_hint, dec_hint, preloaded
 
     def process_latest(self, image_dir):
         """latest_shot.json を指紋照合しながら更新する"""
@@ -354,8 +616,8 @@ class SkySolverEngine:
 
         # 1. 開始時の指紋取得
         try:
-            with open(latest_json, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            with open(latest_json, 'rb') as f:
+                data = orjson.loads(f.read())
                 if isinstance(data, list):
                     if not data:
                         print("SSE>> [Error] latest_shot.json list is empty."); return
@@ -379,8 +641,8 @@ class SkySolverEngine:
 
         # 3. 書き込み直前の照合と更新
         try:
-            with open(latest_json, 'r+', encoding='utf-8') as f:
-                current_data = json.load(f)
+            with open(latest_json, 'r+b') as f:
+                current_data = orjson.loads(f.read())
                 if isinstance(current_data, list):
                     if not current_data:
                         print("SSE>> [Warning] File content is empty during writing. Skipping update."); return
@@ -392,7 +654,7 @@ class SkySolverEngine:
                     print(f"SSE>> Fingerprint match. Updating latest_shot.json.")
                     self._apply_res_to_dict(current_record_root, res)
                     f.seek(0)
-                    json.dump(current_data, f, indent=4, ensure_ascii=False)
+                    f.write(orjson.dumps(current_data, option=_JSON_DUMP_OPTS))
                     f.truncate()
                 else:
                     print(f"SSE>> [Warning] Fingerprint mismatch! Next shot already started. Skipping update.")
@@ -402,6 +664,39 @@ class SkySolverEngine:
         except Exception as e:
             print(f"SSE>> [Error] Final update failed: {e}")
 
+# --- 並列バッチ処理 (select モードのフォルダ指定) ---
+# ワーカーは解析のみを行い、ログ更新は親プロセスで1件ずつ行う (同時書き換えによる取りこぼし防止)
+_pool_engine = None
+
+def _pool_init(pool_root, all_sky_enabled, force_mode, cachedir, cache_max):
+    global _pool_engine
+    # solve-field の --dir 出力が衝突しないようプロセスごとに作業ディレクトリを分ける
+    _pool_engine = SkySolverEngine(workdir=os.path.join(pool_root, str(os.getpid())),
+                                   all_sky_enabled=all_sky_enabled, force_mode=force_mode,
+                                   cachedir=cachedir, cache_max=cache_max, parallel_passes=False)
+
+def _pool_solve(target_path):
+    out = _pool_engine._solve_target(target_path)
+    return target_path, (out[:3] if out is not None else None)
+
+def run_batch(sse, paths, jobs):
+    if jobs <= 1 or len(paths) <= 1:
+        for path in paths:
+            sse.process_target(path)
+        return
+    pool_root = tempfile.mkdtemp(prefix="skysolver_pool_")
+    try:
+        with multiprocessing.Pool(processes=jobs, initializer=_pool_init,
+                                  initargs=(pool_root, sse.all_sky_enabled, sse.force_mode, sse.cachedir,
+                                            max(sse.cache_max, jobs + 1))) as pool:
+            for path, out in pool.imap_unordered(_pool_solve, paths):
+                if out is None: continue
+                res, ra_hint, dec_hint = out
+                sse.print_dashboard(res, ra_hint, dec_hint)
+                sse.update_logs(path, res)
+    finally:
+        shutil.rmtree(pool_root, ignore_errors=True)
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('mode', choices=['latest', 'select'])
@@ -409,6 +704,8 @@ def main():
     parser.add_argument('--allsky', action='store_true')
     parser.add_argument('--force', action='store_true')
     parser.add_argument('--session', help='Filter by Session ID')
+    parser.add_argument('--jobs', type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help='Parallel solve processes for folder batches')
     args = parser.parse_args()
     sse = SkySolverEngine(all_sky_enabled=args.allsky, force_mode=args.force)
 
@@ -422,8 +719,8 @@ def main():
                     log_path = os.path.join(t, "shutter_log.json")
                     if os.path.exists(log_path):
                         try:
-                            with open(log_path, 'r', encoding='utf-8') as f:
-                                for r in json.load(f):
+                            with open(log_path, 'rb') as f:
+                                for r in orjson.loads(f.read()):
                                     if r.get("session_id") == args.session:
                                         name = r.get("record", {}).get("file", {}).get("name")
                                         if name:
@@ -431,11 +728,12 @@ def main():
                         except Exception as e:
                             print(f"SSE>> [Warning] Failed to read shutter_log.json for session filter: {e}")
                 
-                files = sorted([f for f in os.listdir(t) if f.lower().endswith(('.dng', '.raw'))])
-                for f in files:
-                    if allowed_files is not None and f not in allowed_files:
-                        continue
-                    sse.process_target(os.path.join(t, f))
+                with os.scandir(t) as it:
+                    files = sorted((e.name, e.path) for e in it
+                                   if e.name.lower().endswith(('.dng', '.raw')) and e.is_file())
+                paths = [path for name, path in files
+                         if allowed_files is None or name in allowed_files]
+                run_batch(sse, paths, args.jobs)
             else:
                 sse.process_target(t)
         elif args.mode == 'latest' and args.target:
@@ -9,11 +9,21 @@ import select
 import urllib.request
 import urllib.error
 from datetime import datetime, timezone
-from timezonefinder import TimezoneFinder
-import pytz
+from zoneinfo import ZoneInfo
 
-# TimezoneFinderをグローバルに初期化
-tf = TimezoneFinder()
+# TimezoneFinder はポリゴンDBの読み込みが重いため、初回使用時に生成する (--flashair では不要)
+_tf = None
+
+def _get_tf():
+    global _tf
+    if _tf is None:
+        from timezonefinder import TimezoneFinder
+        _tf = TimezoneFinder()
+    return _tf
+
+# indi_getprop の固定引数と、プロセス全体の上限 (秒)
+_GETPROP_ARGV = ("indi_getprop", "-t", "1")
+_GETPROP_TIMEOUT_SEC = 2.0
 
 def parse_sexagesimal(val):
     """
@@ -34,7 +44,7 @@ def parse_sexagesimal(val):
         
         sign = -1 if d < 0 or parts[0].startswith('-') else 1
         return d + (sign * m / 60.0) + (sign * s / 3600.0)
-    except:
+    except (TypeError, ValueError):
         return None
 
 def calc_lst(longitude, dt_utc):
@@ -49,7 +59,7 @@ def calc_lst(longitude, dt_utc):
         gmst = gmst % 360.0
         lst_deg = (gmst + longitude) % 360.0
         return lst_deg / 15.0
-    except:
+    except (AttributeError, TypeError, ValueError):
         return None
 
 def format_ra(ra_deg):
@@ -148,12 +158,12 @@ def load_config(config_path_arg=None):
                             if k in ["LAST_LATITUDE", "LAST_LONGITUDE", "LAST_ELEVATION"]:
                                 try:
                                     config[k] = float(target_dict[k])
-                                except:
+                                except (TypeError, ValueError):
                                     config[k] = target_dict[k]
                             else:
                                 config[k] = target_dict[k]
                 break
-            except:
+            except (OSError, TypeError, ValueError):
                 pass
     return config
 
@@ -163,16 +173,16 @@ def get_prop(device, property_name, element_name):
     """
     full_prop = f"{device}.{property_name}.{element_name}"
     try:
-        result = subprocess.check_output(
-            ["indi_getprop", "-t", "1", full_prop],
-            stderr=subprocess.DEVNULL
-        ).decode().strip()
-        
-        if "=" in result:
-            return result.split("=", 1)[1].strip()
-    except:
+        # 見つからない場合は何も出力されないため、終了コードは見ずに出力だけを読む
+        result = subprocess.run(
+            [*_GETPROP_ARGV, full_prop],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            text=True, timeout=_GETPROP_TIMEOUT_SEC
+        ).stdout
+    except (subprocess.SubprocessError, OSError):
         return None
-    return None
+    _, sep, val = result.partition("=")
+    return val.strip() if sep else None
 
 def get_gps_data(timeout=1.5):
     """
@@ -214,15 +224,15 @@ def get_local_timestamp(dt_utc, lat, lon):
     経緯度から現地タイムゾーンを特定し、タイムゾーンオフセット付きの現地時間ISO 8601文字列を返す
     """
     try:
-        tz_name = tf.timezone_at(lat=lat, lng=lon) or "Asia/Tokyo"
-        tz_obj = pytz.timezone(tz_name)
+        tz_name = _get_tf().timezone_at(lat=lat, lng=lon) or "Asia/Tokyo"
+        tz_obj = ZoneInfo(tz_name)
         dt_local = dt_utc.astimezone(tz_obj)
         offset_str = dt_local.strftime('%z')
         offset_formatted = f"{offset_str[:3]}:{offset_str[3:]}"
         return dt_local.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + offset_formatted
     except Exception:
         try:
-            tz_obj = pytz.timezone("Asia/Tokyo")
+            tz_obj = ZoneInfo("Asia/Tokyo")
             dt_local = dt_utc.astimezone(tz_obj)
             return dt_local.strftime('%Y-%m-%dT%H:%M:%S.000+09:00')
         except Exception:
@@ -303,7 +313,7 @@ def main():
             try:
                 # 'Z' 終端をオフセット表現に置換してパース
                 dt_utc = datetime.fromisoformat(time_str.replace("Z", "+00:00"))
-            except:
+            except (AttributeError, ValueError):
                 pass
  
     # GPSから位置情報が取得できない場合は設定ファイルのデフォルト値（前回値）にフォールバック
@@ -393,7 +403,7 @@ def main():
                             if ha_val < -12:
                                 ha_val += 24
                             pier_side = "EAST" if ha_val < 0 else "WEST"
-                except:
+                except (TypeError, ValueError):
                     pass
 
     # 結果データの組み立て
@@ -18,10 +18,10 @@ __json_spec__ = "1.6.2"
 import os
 import sys
 import time
-import json
 import queue
 import threading
 import requests
+from requests.adapters import HTTPAdapter
 import subprocess
 import logging
 import re
@@ -34,10 +34,10 @@ from dataclasses import dataclass
 logging.getLogger('exifread').setLevel(logging.ERROR)
 
 # --- GPIO Backend Configuration ---
-# Forces the use of the 'lgpio' factory. This is critical for compatibility 
-# with newer Raspberry Pi hardware (Pi 5) and newer OS versions (Bookworm).
-os.environ["GPIOZERO_PIN_FACTORY"] = "lgpio"
-from gpiozero import LED
+# The shutter line is driven through 'lgpio' directly. lgpio is the backend that
+# works on newer Raspberry Pi hardware (Pi 5) and OS versions (Bookworm), and
+# calling it without a gpiozero device in between keeps the trigger jitter low.
+import lgpio
 
 # --- Project-Specific Modules ---
 # These modules are assumed to be in the same directory or python path.
@@ -56,21 +56,31 @@ CONFIG = {
     "JSON_SPEC": __json_spec__,     # JSON metadata specification version
     
     "GPIO_SHUTTER": 27,             # GPIO pin (BCM) connected to the shutter relay/optocoupler
+    "GPIO_CHIP": 0,                 # gpiochip number of the 40-pin header (4 on Pi 5 with kernels before 6.6.45)
     "DEFAULT_BULB_SEC": 10.0,       # Default exposure time for Bulb mode if not specified
     "TRIGGER_PULSE_SEC": 1.0,       # Duration of the trigger pulse for standard (non-Bulb) shots
     "SHUTTER_COMPENSATION": 0.35,   # Latency offset to account for mechanical shutter lag
     "SHUTTER_OFF_SEC": 1.0,         # Mandatory settle time/cooldown between consecutive shots
     "DISPLAY_MODE": "full",         # Verbosity level of console output (full/simple/off)
+    "INDI_REFRESH_SEC": 0.5,        # Interval of the background INDI telemetry refresh
     
     # Network & Storage
     "FLASHAIR_URL": "http://192.168.50.200",      # IP address of the FlashAir W-04 card
+    "FLASHAIR_IDLE_POLL_MAX_SEC": 4.0,            # Upper bound of the idle polling backoff (no shot pending)
+    "DOWNLOAD_FSYNC_EVERY": 10,                   # Downloaded images persisted (fsync) together per batch
+    "CSV_FSYNC_EVERY": 10,                        # CSV log rows written between fsync() calls
+    "ANALYZER_WORKERS": 2,                        # Threads parsing Exif in parallel (logs are still written in order)
+    "DOWNLOAD_Q_MAX": 32,                         # Max shots waiting for download / analysis (back-pressure)
     "SAVE_DIR": os.path.expanduser("~/Pictures"), # Local directory to save downloaded images
     "LOG_FILE_NAME": "shutter_log.csv",           # Filename for the CSV session log
     "LATEST_JSON_NAME": "latest_shot.json",       # Filename for the most recent shot's metadata
     "HISTORY_JSON_NAME": "shutter_log.json",      # Filename for the cumulative JSON log
+    "HISTORY_ROTATE_MB": 0,                       # Rotate the JSON log to *.bak beyond this size (0 = never; other tools read only shutter_log.json)
     "LOG_DEST": "s2cur",                          # Log destination policy (e.g., specific folder structure)
 
     # --- INDI SERVER SETTINGS ---
+    "INDI_HOST": "localhost",               # indiserver host for the persistent telemetry connection
+    "INDI_PORT": 7624,                      # indiserver TCP port
     "INDI_MOUNT": "LX200 OnStep",           # Device name for the Telescope Mount in INDI
     "INDI_WEATHER": "LX200 OnStep",         # Device name for the Weather station/Sensor in INDI
     "PROP_COORD": "EQUATORIAL_EOD_COORD",   # INDI property key for RA/DEC coordinates
@@ -107,7 +117,147 @@ CONFIG = {
 # ==============================================================================
 # 2. Worker Thread: Image Downloader
 # ==============================================================================
-def downloader_worker(download_queue, analysis_queue, stop_event):
+# Shared HTTP session for FlashAir. Keep-alive reuses one TCP connection for the
+# listing, stability and download requests instead of a new handshake per poll.
+SESSION = requests.Session()
+SESSION.headers.update({"Connection": "keep-alive"})
+SESSION.mount("http://", HTTPAdapter(pool_connections=2, pool_maxsize=4, max_retries=0))
+
+# One op=100 listing entry: "<DIR>,<NAME>,<SIZE>,<ATTR>,<DATE>,<TIME>"
+_FA_LINE = re.compile(r'[^,]*,([^,]+),(\d+),')
+
+def _parse_listing(text):
+    """Parses an op=100 response into {name: size}, skipping the WLANSD_FILELIST header."""
+    return {m.group(1): int(m.group(2))
+            for l in text.splitlines()[1:] if (m := _FA_LINE.match(l))}
+
+def _list_files(base_url, target):
+    """
+    Lists one card directory as (name, size, ext, full_remote) tuples, so the
+    extension and remote path are derived once per listing rather than per use.
+    """
+    r = SESSION.get(f"{base_url}/command.cgi", params={"op": "100", "DIR": target}, timeout=5)
+    r.raise_for_status()
+    return [(name, size, os.path.splitext(name)[1].lower(), f"{target}/{name}")
+            for name, size in _parse_listing(r.text).items()]
+
+def _remote_size(base_url, target, fname):
+    """
+    Returns the current size of a file on the FlashAir card (0 if unknown).
+    A HEAD request only transfers headers; the directory listing is the fallback
+    for firmware that does not answer HEAD with a Content-Length.
+    """
+    try:
+        r = SESSION.head(f"{base_url}{target}/{fname}", timeout=5)
+        if r.status_code == 200 and "Content-Length" in r.headers:
+            return int(r.headers["Content-Length"])
+        return next((size for name, size, _, _ in _list_files(base_url, target) if name == fname), 0)
+    except (requests.RequestException, ValueError):
+        return 0
+
+def _sync_downloads(paths, save_dir):
+    """
+    Persists a batch of downloaded images: fsync each file (its pages are normally
+    written back already, so this is cheap) and then the directory entries once.
+    """
+    for path in paths:
+        try:
+            fd = os.open(path, os.O_RDONLY)
+            try: os.fsync(fd)
+            finally: os.close(fd)
+        except OSError:
+            pass
+    try:
+        dfd = os.open(save_dir, os.O_RDONLY | os.O_DIRECTORY)
+        try: os.fsync(dfd)
+        finally: os.close(dfd)
+    except OSError:
+        pass
+    paths.clear()
+
+def _fetch_worker(fetch_q, download_queue, analysis_queue, stop_event, known_files):
+    """
+    Waits for each claimed file to finish writing on the card, downloads it and
+    passes the completed ShotRecord to the analyzer. Runs beside the directory scan
+    in downloader_worker so that a long stability wait never delays discovery.
+    """
+    base_url = CONFIG["FLASHAIR_URL"]
+    save_dir = CONFIG["SAVE_DIR"]
+    unsynced = []   # Downloaded paths not yet fsynced (persisted in batches)
+
+    while not (stop_event.is_set() and fetch_q.empty()):
+        try:
+            shot_data, target, (fname, fsize, ext, full_remote) = fetch_q.get(timeout=1)
+        except queue.Empty:
+            continue
+
+        # Create a local filename: YYMMDD_OriginalName.ext
+        date_prefix = datetime.now().strftime('%y%m%d')
+        new_fname = f"{date_prefix}_{fname}"
+        local_path = os.path.join(save_dir, new_fname)
+        
+        # Step 4: Stability Check (Wait for write completion)
+        # Cameras take time to write large RAW files. We probe the file size
+        # with a backoff (0.2s, 0.3s, ... up to 2s) until it stops changing.
+        current_fsize = fsize
+        prev_size = -1
+        delay = 0.2
+        # Max wait: 25 seconds
+        deadline = time.monotonic() + 25
+        while time.monotonic() < deadline:
+            new_size = _remote_size(base_url, target, fname)
+            # If size is > 0 and hasn't changed since the last probe, it's done.
+            if new_size > 0 and new_size == prev_size:
+                break
+            if new_size > 0: current_fsize = new_size
+            prev_size = new_size
+            time.sleep(delay)
+            delay = min(delay * 1.5, 2.0)
+        
+        utils.sp_print(f"Downloading: {new_fname}", CONFIG, level="full")
+        
+        try:
+            # Step 5: Stream the binary content straight to disk
+            # (avoids holding the whole RAW file in memory as one bytes object)
+            with SESSION.get(f"{base_url}{full_remote}", timeout=60, stream=True) as resp:
+                resp.raise_for_status()
+                with open(local_path, 'wb') as f:
+                    for chunk in resp.iter_content(chunk_size=65536):
+                        f.write(chunk)
+                    f.flush()
+                    # No per-file fsync (it stalls this thread for seconds per RAW on SD cards).
+                    # DONTNEED starts asynchronous write-back and lets the kernel drop the pages
+                    # instead of evicting more useful cache on low-RAM Pis.
+                    if hasattr(os, "posix_fadvise"):
+                        os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+            # Persist downloads in batches (data + directory entries)
+            unsynced.append(local_path)
+            if len(unsynced) >= CONFIG["DOWNLOAD_FSYNC_EVERY"]:
+                _sync_downloads(unsynced, save_dir)
+            
+            # Step 6: Update ShotRecord and pass to Analysis/Logger
+            shot_data.local_path = local_path
+            shot_data.filename = new_fname
+            shot_data.file_format = ext[1:].upper()
+            shot_data.file_size_mb = current_fsize / (1024 * 1024)
+            
+            analysis_queue.put(shot_data)
+            
+        except Exception as e:
+            utils.sp_print(f"Download Error: {e}", CONFIG, level="simple")
+            # If download fails, release the file and return the task to the queue so
+            # the scan pairs them again on its next pass (risky if file is corrupt)
+            known_files.discard(full_remote)
+            download_queue.put(shot_data) 
+        finally:
+            # Balance the scanner's get() so Queue.join() in main() still completes
+            download_queue.task_done()
+
+    # Persist whatever is left of the last batch on shutdown
+    if unsynced:
+        _sync_downloads(unsynced, save_dir)
+
+def downloader_worker(download_queue, analysis_queue, stop_event, new_shot_event):
     """
     Background worker that polls the FlashAir card for new images.
     
@@ -122,23 +272,44 @@ def downloader_worker(download_queue, analysis_queue, stop_event):
         analysis_queue (Queue): Sends completed 'ShotRecord' objects (with file paths) 
                                 to the analysis/logger thread.
         stop_event (Event): Threading event to signal shutdown.
+        new_shot_event (Event): Set by the main thread after each trigger so an idle
+                                worker wakes up immediately instead of on its next poll.
     """
     base_url = CONFIG["FLASHAIR_URL"]
-    save_dir = CONFIG["SAVE_DIR"]
     known_files = set() # Keeps track of files we have already seen or processed
     last_target = ""    # The last DCIM directory we scanned
+    idle_sleep = 1.0    # Current idle polling interval (grows while the card stays unchanged)
+
+    # Files claimed by this scan are waited for and downloaded on a separate thread
+    fetch_q = utils.SPSCQueue()
+    t_fetch = threading.Thread(target=_fetch_worker,
+                               args=(fetch_q, download_queue, analysis_queue, stop_event, known_files))
+    t_fetch.start()
 
     while not (stop_event.is_set() and download_queue.empty()):
+        # Step 0: Idle check. While no shot is pending, ask the card whether its file
+        # system changed (op=102 returns "1" once after an update) before listing
+        # directories, and back off exponentially while it stays quiet.
+        if last_target and download_queue.empty():
+            try:
+                updated = SESSION.get(f"{base_url}/command.cgi?op=102", timeout=5).text.strip() == "1"
+            except Exception:
+                updated = True
+            if not updated:
+                new_shot_event.wait(idle_sleep)
+                idle_sleep = min(idle_sleep * 2, CONFIG["FLASHAIR_IDLE_POLL_MAX_SEC"])
+                continue
+        idle_sleep = 1.0
+
         target = None
         try:
             # Step 1: Discover the latest directory (e.g., 100__TSB) under /DCIM
             # FlashAir command op=100 lists files/dirs.
-            r = requests.get(f"{base_url}/command.cgi?op=100&DIR=/DCIM", timeout=5)
+            r = SESSION.get(f"{base_url}/command.cgi?op=100&DIR=/DCIM", timeout=5)
             # Parse response to find directories (usually containing '_')
-            dirs = [l.split(',')[1] for l in r.text.strip().splitlines()[1:] if '_' in l.split(',')[1]]
+            dirs = [name for name in _parse_listing(r.text) if '_' in name]
             if dirs:
-                dirs.sort()
-                target = f"/DCIM/{dirs[-1]}" # Select the last (newest) directory
+                target = f"/DCIM/{max(dirs)}" # Select the last (newest) directory
         except Exception: 
             # Connection glitch or timeout; wait and retry
             time.sleep(2); continue
@@ -148,97 +319,76 @@ def downloader_worker(download_queue, analysis_queue, stop_event):
             
         # Optimization: Only reset/log if the directory has changed
         if target != last_target: 
+            # Only the newest directory is scanned, so entries for the previous one can
+            # never match again; drop them to keep the set bounded over a long night.
+            # (Pruned in place: the fetch thread shares this set and may discard() from it
+            # concurrently, so filter a copy; copy() and intersection_update() are each atomic.)
+            prefix = f"{target}/"
+            known_files.intersection_update([k for k in known_files.copy() if k.startswith(prefix)])
             last_target = target
 
         try:
             # Step 2: List files in the target directory
-            r = requests.get(f"{base_url}/command.cgi", params={"op": "100", "DIR": target}, timeout=5)
-            if r.status_code == 200:
-                for line in r.text.strip().splitlines()[1:]:
-                    parts = line.split(',')
-                    if len(parts) < 3: continue
+            for fname, fsize, ext, full_remote in _list_files(base_url, target):
+                # Step 3: Filter for valid image formats (RAW/DNG/JPG)
+                if ext in ['.dng', '.jpg'] and full_remote not in known_files:
                     
-                    fname = parts[1]
-                    fsize = int(parts[2])
-                    full_remote = f"{target}/{fname}"
-                    ext = os.path.splitext(fname)[1].lower()
-
-                    # Step 3: Filter for valid image formats (RAW/DNG/JPG)
-                    if ext in ['.dng', '.jpg'] and full_remote not in known_files:
+                    # Startup Condition: If this is the first scan, just mark existing files 
+                    # as 'known' so we don't download old photos from the card.
+                    if not known_files and last_target == "":
+                        known_files.add(full_remote); continue
                         
-                        # Startup Condition: If this is the first scan, just mark existing files 
-                        # as 'known' so we don't download old photos from the card.
-                        if not known_files and last_target == "":
-                            known_files.add(full_remote); continue
-                            
-                        # If the main thread has signaled a shot was taken...
-                        if not download_queue.empty():
-                            # Retrieve the metadata (ShotRecord) associated with this capture
-                            shot_data = download_queue.get()
-                            
-                            # Create a local filename: YYMMDD_OriginalName.ext
-                            date_prefix = datetime.now().strftime('%y%m%d')
-                            new_fname = f"{date_prefix}_{fname}"
-                            local_path = os.path.join(save_dir, new_fname)
-                            
-                            # Step 4: Stability Check (Wait for write completion)
-                            # Cameras take time to write large RAW files. We poll the file size
-                            # until it stops changing.
-                            current_fsize = fsize
-                            # Max wait: 25 seconds
-                            for _ in range(25): 
-                                time.sleep(1)
-                                try:
-                                    chk = requests.get(f"{base_url}/command.cgi", params={"op": "100", "DIR": target}, timeout=5)
-                                    # Parse the size of the specific file again
-                                    new_size = next((int(l.split(',')[2]) for l in chk.text.strip().splitlines() if fname in l), 0)
-                                    # If size is > 0 and hasn't changed since last second, it's done.
-                                    if new_size > 0 and new_size == current_fsize: 
-                                        break
-                                    current_fsize = new_size
-                                except: continue
-                            
-                            utils.sp_print(f"Downloading: {new_fname}", CONFIG, level="full")
-                            
-                            try:
-                                # Step 5: Download the binary content
-                                resp = requests.get(f"{base_url}{full_remote}", timeout=60)
-                                with open(local_path, 'wb') as f:
-                                    f.write(resp.content)
-                                    # Ensure data is physically written to disk
-                                    f.flush()
-                                    os.fsync(f.fileno())
-                                
-                                # Step 6: Update ShotRecord and pass to Analysis/Logger
-                                shot_data.local_path = local_path
-                                shot_data.filename = new_fname
-                                shot_data.file_format = ext[1:].upper()
-                                shot_data.file_size_mb = current_fsize / (1024 * 1024)
-                                
-                                analysis_queue.put(shot_data)
-                                download_queue.task_done()
-                                known_files.add(full_remote)
-                                
-                            except Exception as e:
-                                utils.sp_print(f"Download Error: {e}", CONFIG, level="simple")
-                                # If download fails, return the task to queue to retry (risky if file is corrupt)
-                                download_queue.put(shot_data) 
-                        else:
-                            # Use Case: Manual shutter release (not via script).
-                            # We mark it as known to ignore it, or we could auto-download without metadata.
-                            # Current logic: Ignore manual shots.
-                            pass
-                            known_files.add(full_remote)
+                    # If the main thread has signaled a shot was taken...
+                    if not download_queue.empty():
+                        # Retrieve the metadata (ShotRecord) associated with this capture
+                        # and hand the file to the fetch thread, so its stability wait
+                        # does not stop this loop from pairing the next shot with its file.
+                        shot_data = download_queue.get()
+                        known_files.add(full_remote)
+                        fetch_q.put((shot_data, target, (fname, fsize, ext, full_remote)))
+                    else:
+                        # Use Case: Manual shutter release (not via script).
+                        # We mark it as known to ignore it, or we could auto-download without metadata.
+                        # Current logic: Ignore manual shots.
+                        pass
+                        known_files.add(full_remote)
         except Exception: 
             pass
         
-        # Idle briefy before next poll
-        time.sleep(1)
+        # Idle briefy before next poll. While a shot is pending keep the 1s cadence;
+        # otherwise block until main() signals a new shot (timeout as a safety net).
+        if download_queue.empty():
+            new_shot_event.wait(timeout=2.0)
+            new_shot_event.clear()
+        else:
+            time.sleep(1)
+
+    fetch_q.wake()
+    t_fetch.join()
 
 
 # ==============================================================================
 # 3. Main Execution Control
 # ==============================================================================
+_TZ_CACHE = {}  # UTC offset string ("+09:00", "-05:30") -> timezone (constant for a session)
+
+def _tz_from_offset(offset_str):
+    """Returns a fixed-offset timezone for an "+HH:MM" string, falling back to UTC."""
+    tz = _TZ_CACHE.get(offset_str)
+    if tz is None:
+        tz = timezone.utc  # Fallback to UTC if format is unrecognized
+        # Fixed-width field: slice it instead of running a regex
+        if (isinstance(offset_str, str) and len(offset_str) == 6 and offset_str[0] in "+-"
+                and offset_str[3] == ':' and offset_str[1:3].isdigit() and offset_str[4:6].isdigit()):
+            sign = -1 if offset_str[0] == '-' else 1
+            try:
+                # The sign applies to hours and minutes together ("-00:30" is -30m)
+                tz = timezone(timedelta(hours=sign * int(offset_str[1:3]), minutes=sign * int(offset_str[4:6])))
+            except ValueError:
+                pass  # Out of range (|offset| >= 24h)
+        _TZ_CACHE[offset_str] = tz
+    return tz
+
 def main():
     """
     Main application entry point. 
@@ -280,7 +430,7 @@ def main():
         elif k in ["filter", "fil"]:    CONFIG["EQUIPMENT"]["filter"] = val
         elif k in ["focal", "f"]:
             try: CONFIG["EQUIPMENT"]["focal_length_mm"] = int(val)
-            except: pass
+            except Exception: pass
             
         # [SYSTEM / INDI] Hardware & Paths
         elif k == "dir":      CONFIG["SAVE_DIR"] = os.path.abspath(os.path.expanduser(val))
@@ -306,11 +456,11 @@ def main():
         CONFIG["CONTEXT"]["session"] = datetime.now().strftime('%Y%m%d_%H%M')
 
     # Ensure the local save directory exists
-    if not os.path.exists(CONFIG["SAVE_DIR"]):
-        os.makedirs(CONFIG["SAVE_DIR"], exist_ok=True)
+    os.makedirs(CONFIG["SAVE_DIR"], exist_ok=True)
 
     # --- Hardware & Threading Setup ---
-    shutter = LED(CONFIG["GPIO_SHUTTER"])
+    gpio_h = lgpio.gpiochip_open(CONFIG["GPIO_CHIP"])
+    lgpio.gpio_claim_output(gpio_h, CONFIG["GPIO_SHUTTER"], 0)
 
     # Startup Status Report
     utils.sp_print(f"=== ShutterPro03 (v{CONFIG['VERSION']}) === Engine Online =============", CONFIG, level="simple")
@@ -321,10 +471,14 @@ def main():
     ## --- Communication with INDI
     utils.sp_print("...Connecting to INDI server and waiting for devices...", CONFIG, level="simple")
     
+    initial_props = None
     try:
         indi = utils.IndiClient(CONFIG)
         # To attempt device connection internally, perform a test acquisition here.
-        test_data = indi.get_observation_data()
+        # The raw properties are kept to seed the telemetry snapshot below, so
+        # startup costs a single INDI round-trip.
+        initial_props = indi.fetch_props()
+        test_data = indi.get_observation_data(props=initial_props)
         
         if test_data:
             # When data is available
@@ -337,102 +491,137 @@ def main():
 
     # ------------------------------------------------------------------
     
-    download_q, analysis_q = queue.Queue(), queue.Queue()
+    # Bounded so a stalled FlashAir or analyzer applies back-pressure instead of
+    # growing the queues for the rest of the night
+    # download_q has two producers (this loop, and the fetch thread re-queueing a
+    # failed download), so it stays a locked queue.Queue rather than an SPSCQueue
+    download_q = queue.Queue(maxsize=CONFIG["DOWNLOAD_Q_MAX"])
+    analysis_q = utils.SPSCQueue(maxsize=CONFIG["DOWNLOAD_Q_MAX"])
     stop_event = threading.Event()
+    new_shot_event = threading.Event()
+
+    # Refresh the raw INDI properties in the background so a slow INDI server never
+    # stretches the gap between shots. The capture loop reads the latest snapshot
+    # from this 1-slot box; replacing the list item is atomic under the GIL.
+    telemetry_ref = [initial_props if initial_props is not None else indi.fetch_props()]
+    def telemetry_worker():
+        while not stop_event.wait(CONFIG["INDI_REFRESH_SEC"]):
+            telemetry_ref[0] = indi.fetch_props()
+    threading.Thread(target=telemetry_worker, daemon=True).start()
 
     # Launch background worker threads
     # t_down: Handles FlashAir downloading
     # t_anal: Handles EXIF analysis and CSV logging
-    t_down = threading.Thread(target=downloader_worker, args=(download_q, analysis_q, stop_event))
+    t_down = threading.Thread(target=downloader_worker, args=(download_q, analysis_q, stop_event, new_shot_event))
     t_anal = threading.Thread(target=analyzer_worker, args=(analysis_q, stop_event, CONFIG))
     t_down.start(); t_anal.start()
 
 
     shot_count = 0
+    # Local names for the trigger path (skips global/attribute lookups around the exposure)
+    _gpio_write = lgpio.gpio_write
+    _pin = CONFIG["GPIO_SHUTTER"]
+    # Loop-invariant settings and strings, resolved once instead of per shot
+    _monotonic = time.monotonic      # scheduling (exposure end, settle window)
+    _perf_counter = time.perf_counter  # measurement of the actual exposure
+    _sp_print = utils.sp_print
+    _bulb_hold = bulb_sec + CONFIG["SHUTTER_COMPENSATION"]
+    _pulse_sec = CONFIG["TRIGGER_PULSE_SEC"]
+    _shutter_off_sec = CONFIG["SHUTTER_OFF_SEC"]
+    _total = "Inf" if target_shots <= 0 else str(target_shots)
+    _is_bulb = shot_mode == "bulb"
     try:
         # --- Core Capture Loop ---
         while (target_shots <= 0) or shot_count < target_shots:
             shot_count += 1
             
             # --- 1. Acquire Telemetry ---
-            # Fetch current coordinates, weather, etc. from INDI
-            obs_data = indi.get_observation_data()
+            # Read the clock once per shot; the same instant is used for LST/hour angle
+            # and for the UTC/local timestamps below, so they cannot drift apart.
+            now_utc = datetime.now(timezone.utc)
+            # Build current coordinates, weather, etc. from the latest INDI snapshot
+            obs_data = indi.get_observation_data(now_utc, props=telemetry_ref[0])
 
             # --- 2. Calculate Timezone-aware Local Time ---
-            now_utc = datetime.now(timezone.utc)
-            try:
-                # Robustly parse the UTC offset string (e.g., "+09:00" or "-05:30")
-                offset_str = obs_data.get('utc_offset', "+00:00")
-                # Parse hour and minute parts safely
-                match = re.match(r"([+-])(\d{2}):(\d{2})", offset_str)
-                if match:
-                    sign = 1 if match.group(1) == '+' else -1
-                    h_off = int(match.group(2)) * sign
-                    m_off = int(match.group(3)) * sign
-                    tz_delta = timedelta(hours=h_off, minutes=m_off if h_off >= 0 else -m_off)
-                    current_tz = timezone(tz_delta)
-                else:
-                    # Fallback to UTC if format is unrecognized
-                    current_tz = timezone.utc
-            except Exception:
-                current_tz = timezone.utc
+            offset_str = obs_data.get('utc_offset', "+00:00")
+            current_tz = _tz_from_offset(offset_str)
 
             now_local = now_utc.astimezone(current_tz)
             
             # Construct ISO 8601 Timestamp: e.g., 2026-02-15T20:24:00.123+09:00
-            iso_timestamp = now_local.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + obs_data.get('utc_offset', "+00:00")
-            ts_utc_str = now_utc.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + "Z"
+            # (isoformat on the aware datetime appends the same "+HH:MM" offset)
+            iso_timestamp = now_local.isoformat(timespec='milliseconds')
+            ts_utc_str = now_utc.replace(tzinfo=None).isoformat(timespec='milliseconds') + "Z"
             
-            utils.sp_print(f"[{iso_timestamp}] Shutter ON ({shot_count}/{'Inf' if target_shots <= 0 else target_shots})", CONFIG, level="simple")
+            _sp_print(f"[{iso_timestamp}] Shutter ON ({shot_count}/{_total})", CONFIG, level="simple")
             
             # --- 3. GPIO Triggering Block ---
-            start = time.monotonic()
-            shutter.on()
+            start = _monotonic()
+            t0 = _perf_counter()
+            _gpio_write(gpio_h, _pin, 1)
             
-            if shot_mode == "bulb":
+            if _is_bulb:
                 # BULB MODE:
                 # Hold the shutter open for the specified duration.
                 # 'SHUTTER_COMPENSATION' adjusts for mechanical latency.
-                target_time = start + bulb_sec + CONFIG["SHUTTER_COMPENSATION"]
-                while time.monotonic() < target_time: 
-                    time.sleep(0.01) # Short sleep to prevent CPU hogging
+                target_time = start + _bulb_hold
+                # Sleep once for the bulk of the exposure, then spin for the final ~1 ms
+                # (Linux sleep overshoot is well below that) so the shutter closes on time
+                # without waking ~100 times a second.
+                remaining = target_time - _monotonic()
+                if remaining > 0.002:
+                    time.sleep(remaining - 0.001)
+                while _monotonic() < target_time:
+                    pass
             else:
                 # CAMERA MODE:
                 # Send a short pulse; Camera determines exposure time internally.
-                time.sleep(CONFIG["TRIGGER_PULSE_SEC"])
+                time.sleep(_pulse_sec)
                 
-            shutter.off()
-            actual_exposure_ms = (time.monotonic() - start) * 1000
+            _gpio_write(gpio_h, _pin, 0)
+            actual_exposure_ms = (_perf_counter() - t0) * 1000
+            shutter_off_at = _monotonic()
             # -----------------------------
             
             # --- 4. Queue for Processing ---
             # Create a ShotRecord and push it to the Downloader Queue.
             # The Downloader will pick this up and look for the corresponding file on FlashAir.
-            download_q.put(ShotRecord(
+            # The frame is on the card regardless, so the record must never be dropped:
+            # the downloader pairs card files with records in FIFO order, and a missing
+            # record would shift every later image onto the previous shot's metadata.
+            # A full queue therefore holds the capture loop until the downloader catches up.
+            record = ShotRecord(
                 ts_utc_str, 
                 iso_timestamp, 
                 actual_exposure_ms, 
                 obs_data, 
                 shot_mode, 
                 now_local
-            ))
+            )
+            while True:
+                try:
+                    download_q.put(record, timeout=5)
+                    break
+                except queue.Full:
+                    new_shot_event.set()
+                    _sp_print(f"Warning: download queue full, waiting to queue shot {shot_count}", CONFIG, level="simple")
+            new_shot_event.set()
             
-            # Mandatory cool-down period between shots to ensure camera buffer clears
-            time.sleep(CONFIG["SHUTTER_OFF_SEC"])
+            # Mandatory cool-down period between shots to ensure camera buffer clears.
+            # Measured from shutter-off (queueing above counts towards it) and slept in
+            # 100ms slices so the worker threads get regular hand-offs during the window.
+            settle_until = shutter_off_at + _shutter_off_sec
+            while (t := _monotonic()) < settle_until:
+                time.sleep(min(0.1, settle_until - t))
             
             # Check exit condition
             if target_shots > 0 and shot_count >= target_shots: 
                 break
                 
         # --- Cleanup ---
+        # 残りのダウンロード・解析の完了待ちは finally の Queue.join() で行う
+        # (各ワーカーが task_done() するまでブロックするため、ポーリング不要)
         utils.sp_print("Waiting for background tasks to complete...", CONFIG, level="simple")
-        
-        # 1. まず、キューに仕事が入るのを少し待つ (FlashAirの検知ラグ対策)
-        time.sleep(3)
-        
-        # 2. キューが空になるまで待機
-        while not (download_q.empty() and analysis_q.empty()):
-            time.sleep(1)
 
     except KeyboardInterrupt:
         utils.sp_print("\n--- Interrupted by User (Ctrl+C) ---", CONFIG, level="simple")
@@ -440,7 +629,7 @@ def main():
         # --- ここが重要：以前のバージョンのロジックを適用 ---
         
         # シャッターを確実にオフにする
-        shutter.off()
+        _gpio_write(gpio_h, _pin, 0)
 
         # stop_eventをセットする「前」に、キューの完了を待つ
         # これにより、解析スレッドが最後の仕事を終えるまで待機させます
@@ -448,11 +637,17 @@ def main():
         analysis_q.join()
 
         # すべて終わってからスレッドを停止させる
+        # (待機中のワーカーを起こし、タイムアウトを待たずに終了させる)
         stop_event.set()
+        new_shot_event.set()
+        analysis_q.wake()
 
         # スレッドの完全終了を待つ
         if t_down.is_alive(): t_down.join(timeout=5.0)
         if t_anal.is_alive(): t_anal.join(timeout=5.0)
+        SESSION.close()
+        indi.close()
+        lgpio.gpiochip_close(gpio_h)
         
         utils.sp_print(f"### Finished Session: {CONFIG['CONTEXT']['session']} ###", CONFIG, level="simple")
 
@@ -12,17 +12,35 @@
 # =================================================================
 
 import os
-import json
+import io
 import csv
+import orjson
 import time
-import exifread
+import struct
 import logging
 import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from dataclasses import dataclass
 
 # Import project utilities
 import sp03_utils as utils
+
+# Optional C++ (libexiv2) backed Exif reader. Falls back to exifread when unavailable.
+try:
+    import pyexiv2
+except ImportError:
+    pyexiv2 = None
+
+# Optional fast reader for JPEG (the APP1 segment only). RAW files still go to exifread.
+try:
+    import piexif
+except ImportError:
+    piexif = None
+
+# exifread is imported on first use (not needed at all when pyexiv2 is available)
+exifread = None
     
 @dataclass
 class ShotRecord:
@@ -40,337 +58,739 @@ class ShotRecord:
     file_format: str = ""
     file_size_mb: float = 0.0
 
+# Default number of CSV rows written between fsync() calls (the handle is flushed
+# every row). Overridden by CONFIG["CSV_FSYNC_EVERY"].
+CSV_FSYNC_INTERVAL = 10
+# Upper bound (sec) on how long written log rows stay un-fsynced when shots are sparse
+# (long exposures would otherwise leave the last N-1 rows in the page cache for hours).
+CSV_FSYNC_MAX_SEC = 60.0
+
+# Idle wait (sec) of the analyzer / writer queues. New shots and shutdown (wake())
+# wake them immediately; the timeout is only a safety net for the stop check.
+QUEUE_IDLE_WAIT_SEC = 30.0
+
+# Shots parsed ahead of the log writer (bounds memory if the SD card stalls).
+WRITE_Q_MAX = 64
+# Max shots the writer archives with one CSV write / history append / sync check.
+WRITE_BATCH_MAX = 32
+
+# Back-off (sec) between Exif read attempts when the image cannot be opened yet.
+EXIF_RETRY_DELAYS = (0.05, 0.1, 0.2, 0.4, 0.8)
+
+# Column order of the CSV session log
+CSV_HEADER = [
+    "JSON_ver", "Session_ID", "Objective", "Telescope", "Opt", "Filter", 
+    "Camera", "Aperture", "Focal_L", "F_num", "Pixel_Size", "Pixel_Scale",
+    "LocalTime", "UTC_Time", "UTC_Offset", "LST", "UnixTime", "Sf_Exp_t", 
+    "Diff Sf-Exif", "Mode", "Type", "Filename", "SavedDir", "Format", 
+    "FileSize", "Width", "Height", "ISO_Exif", "Exposure_Exif", 
+    "DateTime_Exif", "Model", "Lat_Exif", "Lon_Exif", "Alt_Exif",
+    "RA", "DEC", "RA_HMS", "DEC_DMS", "MT_Status", "Side", "HourAngle",
+    "Site_Name", "Lat_INDI", "Lon_INDI", "Alt_INDI", "TZ_Source",
+    "Temp_Ext_C", "Humidity_pct", "Pressure_hPa", "DewPoint_C", 
+    "Mnt_CPU_Temp_C", "RPi_CPU_Temp_C", "SSE_Version", "Solve_Status", 
+    "Solve_Path", "Solve_Confidence", "Solve_Timestamp", "Solve_RA", 
+    "Solve_DEC", "Solve_Orientation", "Solve_RA_hms", "Solve_DEC_dms", 
+    "Matched_Stars", "Solve_Time_sec", "SF_version", "SF_status", 
+    "SF_timestamp", "SF_stars", "SF_fwhm_med", "SF_fwhm_mean", 
+    "SF_fwhm_std", "SF_ell_med", "SF_ell_mean", "SF_ell_std"
+]
+_CSV_SEPARATORS = len(CSV_HEADER) - 1
+
+# ==============================================================================
+# Helper Functions: Log File Handles
+# ==============================================================================
+
+def _open_csv(path):
+    return open(path, 'a', newline='', encoding='utf-8')
+
+def _write_csv_preamble(f, CONFIG):
+    """
+    An empty CSV log handle (new log, or one that was replaced/removed while
+    running) gets the spec line and header first.
+    """
+    if f.tell() == 0:
+        f.write(f"# OrionFieldStack CSV Log Spec v{CONFIG['JSON_SPEC']}\n")
+        csv.DictWriter(f, fieldnames=CSV_HEADER).writeheader()
+
+def _csv_line(row):
+    """
+    One CSV log line for a row dict, byte-identical to csv.DictWriter output.
+    Fields are almost always preformatted numbers / HMS strings that need no quoting,
+    so they are joined directly; a row with a delimiter, quote or newline in any
+    field (site or equipment names, file names) goes through the csv module.
+    """
+    fields = ["" if v is None else str(v) for v in map(row.get, CSV_HEADER)]
+    line = ",".join(fields)
+    if line.count(",") == _CSV_SEPARATORS and '"' not in line and "\n" not in line and "\r" not in line:
+        return line + "\r\n"
+    buf = io.StringIO()
+    csv.writer(buf).writerow(fields)
+    return buf.getvalue()
+
+def _open_json_rw(path):
+    """Read/write binary handle for the JSON history, created if missing (never truncated)."""
+    return os.fdopen(os.open(path, os.O_RDWR | os.O_CREAT, 0o644), 'r+b')
+
+def _reopen_if_replaced(f, path, opener=_open_csv):
+    """
+    Returns a handle for 'path' (opened with 'opener'). SSE / LogHarmonizer rewrite
+    the logs through os.replace(), so a long-lived handle must be reopened when the
+    file on disk is no longer the inode it points to.
+    """
+    try:
+        if os.stat(path).st_ino == os.fstat(f.fileno()).st_ino: return f
+    except FileNotFoundError:
+        pass
+    f.close()
+    return opener(path)
+
+def _write_replace(path, data):
+    """
+    Writes 'data' to a temp file beside 'path' and renames it over 'path', so
+    readers (SSE latest mode, ofs_gui) see either the old or the new file, never
+    a truncated one.
+    """
+    tmp = path + ".tmp"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+def _move_aside(path, suffix):
+    """Renames 'path' to '<path>.<epoch>.<suffix>' without overwriting an earlier one."""
+    stamp = int(time.time())
+    dest, n = f"{path}.{stamp}.{suffix}", 1
+    while os.path.exists(dest):
+        dest, n = f"{path}.{stamp}-{n}.{suffix}", n + 1
+    os.replace(path, dest)
+    return dest
+
+def _rotate_if_large(f, path, max_bytes):
+    """
+    Moves the JSON history aside as '<path>.<epoch>.bak' once it exceeds 'max_bytes'
+    and returns a handle to a fresh (empty) log. max_bytes <= 0 disables it (default).
+    SSE, StarForge, the GUI and the harmonizers read only the current log, so records
+    in a .bak (possibly the start of the running session) are invisible to them.
+    """
+    if max_bytes <= 0 or os.fstat(f.fileno()).st_size <= max_bytes:
+        return f
+    f.close()
+    _move_aside(path, "bak")
+    return _open_json_rw(path)
+
+# Bytes read from the end of the history log when looking for its closing ']'.
+_JSON_TAIL_BYTES = 4096
+
+# latest_shot.json: same layout as SSE's rewrites (2-space indent, UTF-8), read by people
+_JSON_DUMP_OPTS = orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+# History appends: one compact record per line (~3x fewer bytes than indented);
+# still a plain JSON array for SSE / LogHarmonizer, which may re-indent it on rewrite
+_JSON_COMPACT_OPTS = orjson.OPT_NON_STR_KEYS
+
+def _append_json_array(f, records):
+    """
+    Appends 'records' to the JSON array in the open 'r+b' handle 'f' without
+    re-reading the file. The closing ']' is located near the end of the file and
+    overwritten with ",<records>]", so each shot costs O(record) instead of O(history).
+    Returns False if the file does not end with a JSON array (caller rewrites it).
+    """
+    entry = b",\n".join(orjson.dumps(r, option=_JSON_COMPACT_OPTS) for r in records)
+    size = f.seek(0, os.SEEK_END)
+    if size == 0:
+        f.write(b"[\n" + entry + b"\n]")
+        f.flush()
+        return True
+
+    start = max(0, size - _JSON_TAIL_BYTES)
+    f.seek(start)
+    tail = f.read().rstrip()
+    if not tail.endswith(b"]"):
+        return False
+    body = tail[:-1].rstrip()
+    if not body:
+        return False  # ']' alone in the tail window: cannot tell if the array is empty
+    sep = b"\n" if body.endswith(b"[") else b",\n"
+    f.seek(start + len(body))
+    f.write(sep + entry + b"\n]")
+    f.truncate()
+    f.flush()
+    return True
+
 # ==============================================================================
 # Helper Functions: Exif Coordinate Conversion
 # ==============================================================================
 
+def _dms_to_deg(n0, d0, n1, d1, n2, d2):
+    """
+    Numeric kernel: (deg, min, sec) rationals given as plain ints -> decimal degrees.
+    Kept free of exifread objects so the per-shot arithmetic stays on primitives.
+    """
+    return n0 / d0 + (n1 / d1) / 60 + (n2 / d2) / 3600
+
+# GPS reference values that make a coordinate negative
+_NEG_REFS = frozenset(('S', 'W'))
+
 def _convert_gps(tags, key_coord, key_ref):
     if key_coord not in tags: return None
     try:
-        c = tags[key_coord]
-        val = (float(c.values[0].num)/c.values[0].den) + \
-              (float(c.values[1].num)/c.values[1].den)/60 + \
-              (float(c.values[2].num)/c.values[2].den)/3600
-        if key_ref in tags and str(tags[key_ref].values) in ['S', 'W']: val = -val
+        v = tags[key_coord].values
+        val = _dms_to_deg(v[0].num, v[0].den, v[1].num, v[1].den, v[2].num, v[2].den)
+        ref = tags.get(key_ref)
+        if ref is not None and str(ref.values) in _NEG_REFS: val = -val
         return val 
-    except: return None
+    except (AttributeError, IndexError, TypeError, ZeroDivisionError): return None
 
 def _get_altitude(tags):
     if "GPS GPSAltitude" not in tags: return None
     try:
         alt = tags["GPS GPSAltitude"].values[0]
-        val = float(alt.num) / alt.den
+        val = alt.num / alt.den
         ref = tags.get("GPS GPSAltitudeRef")
         if ref and ref.values[0] == 1: val = -val
         return val
-    except: return None
+    except (AttributeError, IndexError, TypeError, ZeroDivisionError): return None
 
 
 # ==============================================================================
-# Main Worker: Analyzer (JSON v1.4.0 Compliance)
+# Exif Readers
 # ==============================================================================
+# Each reader returns a dict with the keys: model, w, h, iso, exp, dt, lat, lon, alt
 
-def analyzer_worker(analysis_queue, stop_event, CONFIG):
-    """
-    Background worker that processes downloaded images.
-    v14.1.0: Uses pre-formatted strings (_s) from utils for CSV and 
-             pre-converted numeric values for JSON.
-    """
-    log_dir = os.getcwd() if CONFIG["LOG_DEST"] == "s2cur" else CONFIG["SAVE_DIR"]
-    csv_file = os.path.join(log_dir, CONFIG["LOG_FILE_NAME"])
-    latest_json_file = os.path.join(log_dir, CONFIG["LATEST_JSON_NAME"])
-    history_json_file = os.path.join(log_dir, CONFIG["HISTORY_JSON_NAME"])
+_EXIV2_WIDTH_KEYS = ("Exif.Image.ImageWidth", "Exif.SubImage1.ImageWidth", "Exif.SubImage2.ImageWidth",
+                     "Exif.SubImage3.ImageWidth", "Exif.Photo.PixelXDimension")
+_EXIV2_HEIGHT_KEYS = ("Exif.Image.ImageLength", "Exif.SubImage1.ImageLength", "Exif.SubImage2.ImageLength",
+                      "Exif.SubImage3.ImageLength", "Exif.Photo.PixelYDimension")
 
-    header = [
-        "JSON_ver", "Session_ID", "Objective", "Telescope", "Opt", "Filter", 
-        "Camera", "Aperture", "Focal_L", "F_num", "Pixel_Size", "Pixel_Scale",
-        "LocalTime", "UTC_Time", "UTC_Offset", "LST", "UnixTime", "Sf_Exp_t", 
-        "Diff Sf-Exif", "Mode", "Type", "Filename", "SavedDir", "Format", 
-        "FileSize", "Width", "Height", "ISO_Exif", "Exposure_Exif", 
-        "DateTime_Exif", "Model", "Lat_Exif", "Lon_Exif", "Alt_Exif",
-        "RA", "DEC", "RA_HMS", "DEC_DMS", "MT_Status", "Side", "HourAngle",
-        "Site_Name", "Lat_INDI", "Lon_INDI", "Alt_INDI", "TZ_Source",
-        "Temp_Ext_C", "Humidity_pct", "Pressure_hPa", "DewPoint_C", 
-        "Mnt_CPU_Temp_C", "RPi_CPU_Temp_C", "SSE_Version", "Solve_Status", 
-        "Solve_Path", "Solve_Confidence", "Solve_Timestamp", "Solve_RA", 
-        "Solve_DEC", "Solve_Orientation", "Solve_RA_hms", "Solve_DEC_dms", 
-        "Matched_Stars", "Solve_Time_sec", "SF_version", "SF_status", 
-        "SF_timestamp", "SF_stars", "SF_fwhm_med", "SF_fwhm_mean", 
-        "SF_fwhm_std", "SF_ell_med", "SF_ell_mean", "SF_ell_std"
-    ]
-
-    if not os.path.exists(csv_file):
-        with open(csv_file, 'w', newline='', encoding='utf-8') as f:
-            f.write(f"# OrionFieldStack CSV Log Spec v{CONFIG['JSON_SPEC']}\n")
-            csv.writer(f).writerow(header)
-
-    while not (stop_event.is_set() and analysis_queue.empty()):
-        try: 
-            shot = analysis_queue.get(timeout=1)
-        except queue.Empty: 
-            continue
-        
-        local_path = shot.local_path
-        ex = {"iso": None, "exp": None, "dt": "", "lat": None, "lon": None, "alt": None, "diff": 0.0, "w": 0, "h": 0, "model": ""}
-        
-        time.sleep(1.0)
-        
-        # --- EXIF Extraction Block ---
-        for attempt in range(5):
+def _exiv2_rational(text):
+    """Converts an exiv2 rational string ('num/den') to float."""
+    num, _, den = text.partition('/')
+    return int(num) / int(den) if den else float(num)
+
+def _read_exif_exiv2(local_path):
+    img = pyexiv2.Image(local_path)
+    try:
+        d = img.read_exif()
+    finally:
+        img.close()
+
+    r = {}
+    r["model"] = (d.get("Exif.Image.Model") or "").strip()
+
+    all_w = [int(d[k]) for k in _EXIV2_WIDTH_KEYS if k in d]
+    all_h = [int(d[k]) for k in _EXIV2_HEIGHT_KEYS if k in d]
+    if all_w and all_h: r["w"], r["h"] = max(all_w), max(all_h)
+
+    iso = d.get("Exif.Photo.ISOSpeedRatings")
+    if iso: r["iso"] = int(iso.split()[0])
+    exp = d.get("Exif.Photo.ExposureTime")
+    if exp: r["exp"] = _exiv2_rational(exp)
+    r["dt"] = d.get("Exif.Photo.DateTimeOriginal") or d.get("Exif.Image.DateTime") or ""
+
+    for key, ref_key, out in (("Exif.GPSInfo.GPSLatitude", "Exif.GPSInfo.GPSLatitudeRef", "lat"),
+                              ("Exif.GPSInfo.GPSLongitude", "Exif.GPSInfo.GPSLongitudeRef", "lon")):
+        if key in d:
+            deg, mins, secs = (_exiv2_rational(x) for x in d[key].split()[:3])
+            val = deg + mins / 60 + secs / 3600
+            r[out] = -val if d.get(ref_key) in _NEG_REFS else val
+    if "Exif.GPSInfo.GPSAltitude" in d:
+        alt = _exiv2_rational(d["Exif.GPSInfo.GPSAltitude"])
+        r["alt"] = -alt if d.get("Exif.GPSInfo.GPSAltitudeRef") == "1" else alt
+    return r
+
+# Last tag the logger reads (exifread matches the bare tag name). GPS Altitude (0x0006)
+# follows AltitudeRef (0x0005), so parsing can stop there.
+_EXIFREAD_STOP_TAG = "GPSAltitude"
+
+# Bytes of the file head handed to exifread before falling back to the whole file
+_EXIF_PREFIX_BYTES = 65536
+
+_EXIFREAD_WIDTH_KEYS = ("Image ImageWidth", "EXIF ExifImageWidth")
+_EXIFREAD_HEIGHT_KEYS = ("Image ImageLength", "EXIF ExifImageLength")
+
+def _first(tags, *keys):
+    """First tag present among 'keys' (fallback chain across IFDs), or None."""
+    return next((tags[k] for k in keys if k in tags), None)
+
+def _exifread_ints(tags, keys):
+    """Integer values of the given exifread tags (missing or non-integer tags are skipped)."""
+    out = []
+    for k in keys:
+        t = tags.get(k)
+        if t is None: continue
+        v = t.values
+        if isinstance(v, list): v = v[0] if v else None
+        # SHORT/LONG tags decode to int; anything else is malformed for a size tag
+        if isinstance(v, int): out.append(v)
+    return out
+
+def _read_exif_piexif(local_path):
+    d = piexif.load(local_path)
+    ifd0, exif, gps = d.get("0th", {}), d.get("Exif", {}), d.get("GPS", {})
+    r = {}
+
+    model = ifd0.get(piexif.ImageIFD.Model)
+    if model: r["model"] = model.decode('ascii', 'replace').strip('\x00 ')
+
+    all_w = [v for v in (ifd0.get(piexif.ImageIFD.ImageWidth), exif.get(piexif.ExifIFD.PixelXDimension)) if v]
+    all_h = [v for v in (ifd0.get(piexif.ImageIFD.ImageLength), exif.get(piexif.ExifIFD.PixelYDimension)) if v]
+    if all_w and all_h: r["w"], r["h"] = max(all_w), max(all_h)
+
+    iso = exif.get(piexif.ExifIFD.ISOSpeedRatings)
+    if iso: r["iso"] = int(iso[0] if isinstance(iso, tuple) else iso)
+    exp = exif.get(piexif.ExifIFD.ExposureTime)
+    if exp and exp[1]: r["exp"] = exp[0] / exp[1]
+    dt = exif.get(piexif.ExifIFD.DateTimeOriginal) or ifd0.get(piexif.ImageIFD.DateTime)
+    if dt: r["dt"] = dt.decode('ascii', 'replace')
+
+    for key, ref_key, out in ((piexif.GPSIFD.GPSLatitude, piexif.GPSIFD.GPSLatitudeRef, "lat"),
+                              (piexif.GPSIFD.GPSLongitude, piexif.GPSIFD.GPSLongitudeRef, "lon")):
+        v = gps.get(key)
+        if v:
             try:
-                with open(local_path, 'rb') as f:
-                    tags = exifread.process_file(f, details=True)
-                
-                if "Image Model" in tags: ex["model"] = str(tags["Image Model"])
-                elif "EXIF Model" in tags: ex["model"] = str(tags["EXIF Model"])
-
-                all_w, all_h = [], []
-                for t_name, t_val in tags.items():
-                    if "ImageWidth" in t_name or "0x0100" in t_name:
-                        try: v = t_val.values[0] if isinstance(t_val.values, list) else t_val.values; all_w.append(int(v))
-                        except: pass
-                    if "ImageLength" in t_name or "0x0101" in t_name:
-                        try: v = t_val.values[0] if isinstance(t_val.values, list) else t_val.values; all_h.append(int(v))
-                        except: pass
-                
-                # Check for SubIFDs in raw images to get original resolution
-                subifd_tag = tags.get("Image SubIFDs")
-                if subifd_tag:
-                    import struct
-                    f.seek(0)
-                    header = f.read(4)
-                    endian = '<' if header[:2] == b'II' else '>'
-                    offsets = subifd_tag.values
-                    if not isinstance(offsets, list):
-                        offsets = [offsets]
-                    for offset in offsets:
-                        try:
-                            f.seek(offset)
-                            num_entries_data = f.read(2)
-                            if len(num_entries_data) == 2:
-                                num_entries = struct.unpack(f"{endian}H", num_entries_data)[0]
-                                for _ in range(num_entries):
-                                    entry_data = f.read(12)
-                                    if len(entry_data) < 12:
-                                        break
-                                    tag, tag_type, count, val_offset = struct.unpack(f"{endian}HHII", entry_data)
-                                    if tag == 256 and tag_type in (3, 4):
-                                        all_w.append(val_offset)
-                                    elif tag == 257 and tag_type in (3, 4):
-                                        all_h.append(val_offset)
-                        except:
-                            pass
-
-                if all_w and all_h: ex["w"], ex["h"] = max(all_w), max(all_h)
-                
-                iso = tags.get("EXIF ISOSpeedRatings") or tags.get("Image ISOSpeedRatings")
-                if iso: ex["iso"] = int(iso.values[0])
-                
-                exp = tags.get("EXIF ExposureTime") or tags.get("Image ExposureTime")
-                if exp:
-                    v = exp.values[0]
-                    exposure_val = float(v.num) / v.den if hasattr(v, 'num') else float(v)
-                    ex["exp"] = exposure_val
-                    ex["diff"] = (shot.elapsed_on_ms / 1000) - exposure_val
-                
-                dt = tags.get("EXIF DateTimeOriginal") or tags.get("Image DateTime")
-                if dt: ex["dt"] = str(dt.values)
-                
-                ex["lat"] = _convert_gps(tags, "GPS GPSLatitude", "GPS GPSLatitudeRef")
-                ex["lon"] = _convert_gps(tags, "GPS GPSLongitude", "GPS GPSLongitudeRef")
-                ex["alt"] = _get_altitude(tags)
-                break
-            except: pass
-            time.sleep(1)
-        
-        indi = shot.indi_data
-        
-        # --- DATA ARCHIVING: 1. CSV (利用: indi.get("xxx_s")) ---
-        f_number, pixel_scale = utils.calculate_equipment_specs(CONFIG["EQUIPMENT"])
-        exp_actual = shot.elapsed_on_ms / 1000.0
-        exp_exif = float(ex["exp"]) if ex["exp"] else exp_actual
-        exposure_diff = round(exp_actual - exp_exif, 6)
-        camera_model = ex["model"] if ex["model"] else CONFIG["EQUIPMENT"]["camera"]
-        
-        # utils 側で生成された整形済み文字列 (_s) を使用することで、安全かつ綺麗な表示を実現
-        row = [
-            CONFIG["JSON_SPEC"],
-            CONFIG["CONTEXT"]["session"],
-            CONFIG["CONTEXT"]["objective"],
-            CONFIG["EQUIPMENT"].get("telescope", "N/A"),
-            CONFIG["EQUIPMENT"].get("optics", "N/A"),
-            CONFIG["EQUIPMENT"].get("filter", "N/A"),
-            camera_model,
-            CONFIG["EQUIPMENT"].get("aperture_mm", ""),
-            CONFIG["EQUIPMENT"].get("focal_length_mm", ""),
-            f"{f_number:.2f}" if f_number else "",
-            CONFIG["EQUIPMENT"].get("pixel_size_um", ""),
-            f"{pixel_scale:.3f}" if pixel_scale else "",
-            
-            shot.timestamp_local,
-            shot.timestamp_utc,
-            indi.get("utc_offset", "+09:00"),
-            indi.get("lst_hms", "00:00:00"),
-            f"{shot.dt_object.timestamp():.3f}",
-            f"{exp_actual:.3f}",
-            f"{exposure_diff:.3f}",
-            shot.shot_mode,
-            CONFIG["CONTEXT"].get("frame_type", "test"),
-            
-            shot.filename,
-            CONFIG["SAVE_DIR"],
-            shot.file_format,
-            f"{shot.file_size_mb:.2f}",
-            ex["w"],
-            ex["h"],
-            
-            ex["iso"] if ex["iso"] else "",
-            f"{exp_exif:.3f}",
-            ex["dt"] if ex["dt"] else "",
-            camera_model,
-            ex["lat"] if ex["lat"] else "",
-            ex["lon"] if ex["lon"] else "",
-            ex["alt"] if ex["alt"] else "",
-            
-            indi.get("ra_deg_s", ""),
-            indi.get("dec_deg_s", ""),
-            indi.get("ra_hms", ""),
-            indi.get("dec_dms", ""),
-            indi.get("status", ""),
-            indi.get("side_of_pier", ""),
-            indi.get("hour_angle_s", ""),
-            
-            indi.get("site_name", ""),
-            indi.get("latitude_s", ""),
-            indi.get("longitude_s", ""),
-            indi.get("elevation_s", ""),
-            indi.get("tz_source", ""),
-            
-            indi.get("weather_temp_s", ""),
-            indi.get("weather_humi_s", ""),
-            indi.get("weather_pres_s", ""),
-            indi.get("weather_dew_s", ""),
-            indi.get("cpu_temp_mount_s", ""),
-            indi.get("cpu_temp_rpi_s", ""),
-            
-            # SSE empty fields (12)
-            "", "pending", "", "", "", "", "", "", "", "", "", "",
-            # SF empty fields (10)
-            "", "pending", "", "", "", "", "", "", "", ""
-        ]
+                val = _dms_to_deg(v[0][0], v[0][1], v[1][0], v[1][1], v[2][0], v[2][1])
+            except (IndexError, TypeError, ZeroDivisionError):
+                continue
+            ref = gps.get(ref_key, b"").decode('ascii', 'replace')
+            r[out] = -val if ref in _NEG_REFS else val
+    alt = gps.get(piexif.GPSIFD.GPSAltitude)
+    if alt and alt[1]:
+        val = alt[0] / alt[1]
+        r["alt"] = -val if gps.get(piexif.GPSIFD.GPSAltitudeRef) == 1 else val
+    return r
+
+def _read_exif_exifread(local_path):
+    global exifread
+    if exifread is None:
+        import exifread
+    r = {}
+    with open(local_path, 'rb') as f:
+        # Parse from one in-memory read of the file head (the JPEG APP1 segment is at
+        # most 64KB; TIFF-based RAW keeps IFD0/EXIF/GPS near the start) instead of many
+        # small seek/read calls. Anything not found there is re-read from the file.
+        # details=False skips MakerNote / thumbnail decoding, which the logger never uses
+        head = f.read(_EXIF_PREFIX_BYTES)
+        tags = None
+        try:
+            tags = exifread.process_file(io.BytesIO(head), details=False, stop_tag=_EXIFREAD_STOP_TAG)
+        except Exception:
+            # 途中で切れた IFD に対して exifread は型の定まらない例外を投げる。下の全体読み直しに任せる
+            pass
+        if len(head) == _EXIF_PREFIX_BYTES and not _first(tags or {}, "EXIF ExposureTime", "Image ExposureTime"):
+            f.seek(0)
+            tags = exifread.process_file(f, details=False, stop_tag=_EXIFREAD_STOP_TAG)
+        tags = tags or {}
         
-        with open(csv_file, 'a', newline='', encoding='utf-8') as f:
-            csv.writer(f).writerow(row)
-            f.flush(); os.fsync(f.fileno())
-            
-        # --- DATA ARCHIVING: 2. JSON (利用: indi.get("xxx") の生数値) ---
+        model = _first(tags, "Image Model", "EXIF Model")
+        if model is not None: r["model"] = str(model)
+
+        all_w = _exifread_ints(tags, _EXIFREAD_WIDTH_KEYS)
+        all_h = _exifread_ints(tags, _EXIFREAD_HEIGHT_KEYS)
         
-        json_data = {
-            "version": CONFIG["JSON_SPEC"],
-            "session_id": CONFIG["CONTEXT"]["session"],
-            "objective": CONFIG["CONTEXT"]["objective"],
-            "equipment": {
-                "telescope": CONFIG["EQUIPMENT"].get("telescope"),
-                "optics": CONFIG["EQUIPMENT"].get("optics"),
-                "filter": CONFIG["EQUIPMENT"].get("filter"),
-                "camera": CONFIG["EQUIPMENT"].get("camera"),
-                "aperture_mm": CONFIG["EQUIPMENT"].get("aperture_mm"),
-                "focal_length_mm": CONFIG["EQUIPMENT"].get("focal_length_mm"),
-                "f_number": f_number,
-                "pixel_size_um": CONFIG["EQUIPMENT"].get("pixel_size_um"),
-                "pixel_scale": pixel_scale
-            },
-            "record": {
-                "meta": {
-                    "iso_timestamp": shot.timestamp_local,
-                    "timestamp_utc": shot.timestamp_utc,
-                    "utc_offset": indi.get("utc_offset", "+09:00"),
-                    "lst_hms": indi.get("lst_hms", "00:00:00"),
-                    "unixtime": round(shot.dt_object.timestamp(), 3),
-                    "exposure_actual_sec": round(exp_actual, 3),
-                    "exposure_diff_sec": exposure_diff,
-                    "shot_mode": shot.shot_mode,
-                    "frame_type": CONFIG["CONTEXT"].get("frame_type", "test")
-                },
-                "file": {
-                    "name": shot.filename,
-                    "path": CONFIG["SAVE_DIR"],
-                    "format": shot.file_format,
-                    "size_mb": round(shot.file_size_mb, 2),
-                    "width": ex["w"], "height": ex["h"]
-                },
-                "exif": {
-                    "iso": ex["iso"],
-                    "shutter_sec": round(exp_exif, 3),
-                    "datetime_original": ex["dt"],
-                    "model": camera_model,
-                    "lat": ex["lat"], "lon": ex["lon"], "alt": ex["alt"]
-                },
-                "mount": {
-                    "ra_deg": indi.get("ra_deg"),
-                    "dec_deg": indi.get("dec_deg"),
-                    "ra_hms": indi.get("ra_hms"),
-                    "dec_dms": indi.get("dec_dms"),
-                    "status": indi.get("status", "Unknown"),
-                    "side_of_pier": indi.get("side_of_pier", "Unknown"),
-                    "hour_angle": indi.get("hour_angle")
-                },
-                "location": {
-                    "site_name": indi.get("site_name"),
-                    "latitude": indi.get("latitude"),
-                    "longitude": indi.get("longitude"),
-                    "elevation": indi.get("elevation"),
-                    "tz_source": indi.get("tz_source")
+        # Check for SubIFDs in raw images to get original resolution
+        # (the file must still be open here to walk the SubIFD entries)
+        subifd_tag = tags.get("Image SubIFDs")
+        if subifd_tag:
+            endian = '<' if head[:2] == b'II' else '>'
+            entry_fmt = struct.Struct(f"{endian}HHI4s")  # tag, type, count, value field
+            offsets = subifd_tag.values
+            if not isinstance(offsets, list):
+                offsets = [offsets]
+            for offset in offsets:
+                try:
+                    f.seek(offset)
+                    num_entries = struct.unpack(f"{endian}H", f.read(2))[0]
+                    # One read per SubIFD; only ImageWidth (256) / ImageLength (257) are used
+                    entries = f.read(num_entries * 12)
+                    entries = entries[:len(entries) - len(entries) % 12]
+                    for tag, tag_type, _count, value in entry_fmt.iter_unpack(entries):
+                        if tag in (256, 257) and tag_type in (3, 4):
+                            # SHORT values sit in the first 2 bytes of the value field
+                            v = struct.unpack_from(f"{endian}{'H' if tag_type == 3 else 'I'}", value)[0]
+                            (all_w if tag == 256 else all_h).append(v)
+                except (OSError, struct.error):
+                    pass
+
+    if all_w and all_h: r["w"], r["h"] = max(all_w), max(all_h)
+    
+    iso = _first(tags, "EXIF ISOSpeedRatings", "Image ISOSpeedRatings")
+    if iso: r["iso"] = int(iso.values[0])
+    
+    exp = _first(tags, "EXIF ExposureTime", "Image ExposureTime")
+    if exp:
+        v = exp.values[0]
+        r["exp"] = float(v.num) / v.den if hasattr(v, 'num') else float(v)
+    
+    dt = _first(tags, "EXIF DateTimeOriginal", "Image DateTime")
+    if dt: r["dt"] = str(dt.values)
+    
+    r["lat"] = _convert_gps(tags, "GPS GPSLatitude", "GPS GPSLatitudeRef")
+    r["lon"] = _convert_gps(tags, "GPS GPSLongitude", "GPS GPSLongitudeRef")
+    r["alt"] = _get_altitude(tags)
+    return r
+
+def read_exif(local_path):
+    """
+    Reads the Exif fields used by the logger, preferring the libexiv2 backend,
+    then piexif for JPEG, then exifread.
+    """
+    if pyexiv2 is not None:
+        try:
+            return _read_exif_exiv2(local_path)
+        except RuntimeError:
+            pass  # libexiv2 rejected the file (unsupported/odd RAW): use the Python readers
+    if piexif is not None and local_path.lower().endswith(('.jpg', '.jpeg')):
+        return _read_exif_piexif(local_path)
+    return _read_exif_exifread(local_path)
+
+
+def _csv_template(CONFIG, f_number, pixel_scale):
+    """
+    Per-session constant CSV columns (session, equipment, pending SSE/SF fields).
+    Built once; each shot copies it and fills in the per-shot columns.
+    """
+    row = dict.fromkeys(CSV_HEADER, "")
+    row.update({
+        "JSON_ver": CONFIG["JSON_SPEC"],
+        "Session_ID": CONFIG["CONTEXT"]["session"],
+        "Objective": CONFIG["CONTEXT"]["objective"],
+        "Telescope": CONFIG["EQUIPMENT"].get("telescope", "N/A"),
+        "Opt": CONFIG["EQUIPMENT"].get("optics", "N/A"),
+        "Filter": CONFIG["EQUIPMENT"].get("filter", "N/A"),
+        "Aperture": CONFIG["EQUIPMENT"].get("aperture_mm", ""),
+        "Focal_L": CONFIG["EQUIPMENT"].get("focal_length_mm", ""),
+        "F_num": f"{f_number:.2f}" if f_number else "",
+        "Pixel_Size": CONFIG["EQUIPMENT"].get("pixel_size_um", ""),
+        "Pixel_Scale": f"{pixel_scale:.3f}" if pixel_scale else "",
+        "Type": CONFIG["CONTEXT"].get("frame_type", "test"),
+        "SavedDir": CONFIG["SAVE_DIR"],
+        # SSE / SF fields stay empty until the solvers fill them in
+        "Solve_Status": "pending",
+        "SF_status": "pending",
+    })
+    return row
+
+def _json_skeleton(CONFIG, f_number, pixel_scale):
+    """
+    Per-session constant part of the JSON record (version, session, equipment and
+    the pending analysis block). Built once; each shot only fills in "record".
+    """
+    return {
+        "version": CONFIG["JSON_SPEC"],
+        "session_id": CONFIG["CONTEXT"]["session"],
+        "objective": CONFIG["CONTEXT"]["objective"],
+        "equipment": {
+            "telescope": CONFIG["EQUIPMENT"].get("telescope"),
+            "optics": CONFIG["EQUIPMENT"].get("optics"),
+            "filter": CONFIG["EQUIPMENT"].get("filter"),
+            "camera": CONFIG["EQUIPMENT"].get("camera"),
+            "aperture_mm": CONFIG["EQUIPMENT"].get("aperture_mm"),
+            "focal_length_mm": CONFIG["EQUIPMENT"].get("focal_length_mm"),
+            "f_number": f_number,
+            "pixel_size_um": CONFIG["EQUIPMENT"].get("pixel_size_um"),
+            "pixel_scale": pixel_scale
+        },
+        "record": None,  # placeholder keeps the key order of the spec
+        "analysis": {
+            "SSE": {
+                "sse_version": None,
+                "solve_status": "pending",
+                "solve_path": None,
+                "confidence": None,
+                "timestamp": None,
+                "solved_coords": {
+                    "ra_deg": None, "dec_deg": None, "orientation": None,
+                    "ra_hms": None, "dec_dms": None
                 },
-                "environment": {
-                    "temp_c": indi.get("weather_temp"),
-                    "humidity_pct": indi.get("weather_humi"),
-                    "pressure_hPa": indi.get("weather_pres"),
-                    "dew_point_c": indi.get("weather_dew"),
-                    "cpu_temp_mount_c": indi.get("cpu_temp_mount"),
-                    "cpu_temp_rpi_c": indi.get("cpu_temp_rpi")
+                "process_stats": {
+                    "matched_stars": None, "solve_duration_sec": None
                 }
             },
-            "analysis": {
-                "SSE": {
-                    "sse_version": None,
-                    "solve_status": "pending",
-                    "solve_path": None,
-                    "confidence": None,
-                    "timestamp": None,
-                    "solved_coords": {
-                        "ra_deg": None, "dec_deg": None, "orientation": None,
-                        "ra_hms": None, "dec_dms": None
-                    },
-                    "process_stats": {
-                        "matched_stars": None, "solve_duration_sec": None
-                    }
-                },
-                "SF": {
-                    "sf_version": None,
-                    "sf_status": "pending",
-                    "sf_timestamp": None,
-                    "quality": {
-                        "sf_stars": None,
-                        "sf_fwhm_med": None, "sf_fwhm_mean": None, "sf_fwhm_std": None,
-                        "sf_ell_med": None,  "sf_ell_mean": None,  "sf_ell_std": None
-                    }
+            "SF": {
+                "sf_version": None,
+                "sf_status": "pending",
+                "sf_timestamp": None,
+                "quality": {
+                    "sf_stars": None,
+                    "sf_fwhm_med": None, "sf_fwhm_mean": None, "sf_fwhm_std": None,
+                    "sf_ell_med": None,  "sf_ell_mean": None,  "sf_ell_std": None
                 }
             }
         }
+    }
 
-        with open(latest_json_file, 'w', encoding='utf-8') as f:
-            json.dump(json_data, f, indent=4, ensure_ascii=False)
-        
-        h = []
-        if os.path.exists(history_json_file):
+def _analyze_shot(shot, CONFIG, csv_template, skeleton):
+    """
+    Exif extraction and CSV row / JSON record construction for one shot.
+    Runs on the analyzer pool; returns (row, json_data) for the writer.
+    'csv_template' / 'skeleton' are the shared per-session dicts and are never modified.
+    """
+    local_path = shot.local_path
+    ex = {"iso": None, "exp": None, "dt": "", "lat": None, "lon": None, "alt": None, "w": 0, "h": 0, "model": ""}
+
+    # --- EXIF Extraction Block ---
+    # ファイルはダウンロード完了後にキューへ入るため、待たずに即座に読む。
+    # 一時的に開けない場合のみ指数バックオフで再試行し、解析エラーは即座に諦める
+    for delay in EXIF_RETRY_DELAYS:
+        try:
+            ex.update(read_exif(local_path))
+            break
+        except OSError:
+            time.sleep(delay)
+        except Exception as e:
+            utils.sp_print(f"Exif read failed for {shot.filename}: {e}", CONFIG)
+            break
+
+    # Per-shot values used by both logs, resolved once into locals
+    indi_get = shot.indi_data.get
+    ts_local, ts_utc, fname = shot.timestamp_local, shot.timestamp_utc, shot.filename
+    utc_offset = indi_get("utc_offset", "+09:00")
+    lst_hms = indi_get("lst_hms", "00:00:00")
+    unixtime = shot.dt_object.timestamp()
+    exp_actual = shot.elapsed_on_ms * 0.001
+    save_dir = CONFIG["SAVE_DIR"]
+
+    # --- DATA ARCHIVING: 1. CSV (利用: indi_get("xxx_s")) ---
+    exp_exif = float(ex["exp"]) if ex["exp"] else exp_actual
+    exposure_diff = round(exp_actual - exp_exif, 6)
+    camera_model = ex["model"] if ex["model"] else CONFIG["EQUIPMENT"]["camera"]
+
+    # 固定列はテンプレート (_csv_template) から。utils 側で生成された整形済み文字列 (_s) を使用
+    row = {
+        **csv_template,
+        "Camera": camera_model,
+
+        "LocalTime": ts_local,
+        "UTC_Time": ts_utc,
+        "UTC_Offset": utc_offset,
+        "LST": lst_hms,
+        "UnixTime": f"{unixtime:.3f}",
+        "Sf_Exp_t": f"{exp_actual:.3f}",
+        "Diff Sf-Exif": f"{exposure_diff:.3f}",
+        "Mode": shot.shot_mode,
+
+        "Filename": fname,
+        "Format": shot.file_format,
+        "FileSize": f"{shot.file_size_mb:.2f}",
+        "Width": ex["w"],
+        "Height": ex["h"],
+
+        "ISO_Exif": ex["iso"] if ex["iso"] else "",
+        "Exposure_Exif": f"{exp_exif:.3f}",
+        "DateTime_Exif": ex["dt"] if ex["dt"] else "",
+        "Model": camera_model,
+        "Lat_Exif": ex["lat"] if ex["lat"] else "",
+        "Lon_Exif": ex["lon"] if ex["lon"] else "",
+        "Alt_Exif": ex["alt"] if ex["alt"] else "",
+
+        "RA": indi_get("ra_deg_s", ""),
+        "DEC": indi_get("dec_deg_s", ""),
+        "RA_HMS": indi_get("ra_hms", ""),
+        "DEC_DMS": indi_get("dec_dms", ""),
+        "MT_Status": indi_get("status", ""),
+        "Side": indi_get("side_of_pier", ""),
+        "HourAngle": indi_get("hour_angle_s", ""),
+
+        "Site_Name": indi_get("site_name", ""),
+        "Lat_INDI": indi_get("latitude_s", ""),
+        "Lon_INDI": indi_get("longitude_s", ""),
+        "Alt_INDI": indi_get("elevation_s", ""),
+        "TZ_Source": indi_get("tz_source", ""),
+
+        "Temp_Ext_C": indi_get("weather_temp_s", ""),
+        "Humidity_pct": indi_get("weather_humi_s", ""),
+        "Pressure_hPa": indi_get("weather_pres_s", ""),
+        "DewPoint_C": indi_get("weather_dew_s", ""),
+        "Mnt_CPU_Temp_C": indi_get("cpu_temp_mount_s", ""),
+        "RPi_CPU_Temp_C": indi_get("cpu_temp_rpi_s", ""),
+    }
+
+    # --- DATA ARCHIVING: 2. JSON (利用: indi_get("xxx") の生数値) ---
+
+    json_data = {
+        **skeleton,
+        "record": {
+            "meta": {
+                "iso_timestamp": ts_local,
+                "timestamp_utc": ts_utc,
+                "utc_offset": utc_offset,
+                "lst_hms": lst_hms,
+                "unixtime": round(unixtime, 3),
+                "exposure_actual_sec": round(exp_actual, 3),
+                "exposure_diff_sec": exposure_diff,
+                "shot_mode": shot.shot_mode,
+                "frame_type": CONFIG["CONTEXT"].get("frame_type", "test")
+            },
+            "file": {
+                "name": fname,
+                "path": save_dir,
+                "format": shot.file_format,
+                "size_mb": round(shot.file_size_mb, 2),
+                "width": ex["w"], "height": ex["h"]
+            },
+            "exif": {
+                "iso": ex["iso"],
+                "shutter_sec": round(exp_exif, 3),
+                "datetime_original": ex["dt"],
+                "model": camera_model,
+                "lat": ex["lat"], "lon": ex["lon"], "alt": ex["alt"]
+            },
+            "mount": {
+                "ra_deg": indi_get("ra_deg"),
+                "dec_deg": indi_get("dec_deg"),
+                "ra_hms": indi_get("ra_hms"),
+                "dec_dms": indi_get("dec_dms"),
+                "status": indi_get("status", "Unknown"),
+                "side_of_pier": indi_get("side_of_pier", "Unknown"),
+                "hour_angle": indi_get("hour_angle")
+            },
+            "location": {
+                "site_name": indi_get("site_name"),
+                "latitude": indi_get("latitude"),
+                "longitude": indi_get("longitude"),
+                "elevation": indi_get("elevation"),
+                "tz_source": indi_get("tz_source")
+            },
+            "environment": {
+                "temp_c": indi_get("weather_temp"),
+                "humidity_pct": indi_get("weather_humi"),
+                "pressure_hPa": indi_get("weather_pres"),
+                "dew_point_c": indi_get("weather_dew"),
+                "cpu_temp_mount_c": indi_get("cpu_temp_mount"),
+                "cpu_temp_rpi_c": indi_get("cpu_temp_rpi")
+            }
+        }
+    }
+    return row, json_data
+
+# ==============================================================================
+# Main Worker: Analyzer (JSON v1.4.0 Compliance)
+# ==============================================================================
+
+def _writer_worker(write_q, analysis_queue, done_event, CONFIG):
+    """
+    Single writer for the CSV / JSON logs. Takes (shot, future) pairs in the order
+    the analyzer received them, waits for each result and archives it, so disk
+    latency never holds up Exif parsing and the logs keep shot order.
+    """
+    log_dir = os.getcwd() if CONFIG["LOG_DEST"] == "s2cur" else CONFIG["SAVE_DIR"]
+    csv_file = os.path.join(log_dir, CONFIG["LOG_FILE_NAME"])
+    latest_json_file = os.path.join(log_dir, CONFIG["LATEST_JSON_NAME"])
+    history_json_file = os.path.join(log_dir, CONFIG["HISTORY_JSON_NAME"])
+
+    # Keep the CSV log open for the worker's lifetime instead of reopening it per shot.
+    csv_f = _open_csv(csv_file)
+    _write_csv_preamble(csv_f, CONFIG)
+    unsynced_rows = 0
+    fsync_every = CONFIG.get("CSV_FSYNC_EVERY", CSV_FSYNC_INTERVAL)
+    last_sync = time.monotonic()
+    # The JSON history stays open as well; each shot is appended in place
+    hist_f = _open_json_rw(history_json_file)
+    hist_max_bytes = int(CONFIG.get("HISTORY_ROTATE_MB", 0) * 1024 * 1024)
+
+    try:
+        while not (done_event.is_set() and write_q.empty()):
             try:
-                with open(history_json_file, 'r', encoding='utf-8') as f: h = json.load(f)
-            except: h = []
-        h.append(json_data)
-        with open(history_json_file, 'w', encoding='utf-8') as f:
-            json.dump(h, f, indent=4, ensure_ascii=False)
-        
-        log_msg = f" [Logged]: {shot.filename} (v{CONFIG['VERSION']} / Spec v{CONFIG['JSON_SPEC']})"
-        utils.sp_print(log_msg, CONFIG, level="simple")
-        analysis_queue.task_done()
+                batch = [write_q.get(timeout=QUEUE_IDLE_WAIT_SEC)]
+            except queue.Empty:
+                continue
+            # Take whatever else is already queued so the batch shares one write / sync
+            while len(batch) < WRITE_BATCH_MAX and not write_q.empty():
+                batch.append(write_q.get())
+
+            done = []  # (shot, row, json_data) in shot order
+            for shot, fut in batch:
+                try:
+                    row, json_data = fut.result()
+                    done.append((shot, row, json_data))
+                except Exception as e:
+                    utils.sp_print(f"Log write failed for {shot.filename}: {e}", CONFIG)
+            try:
+                if not done: continue
+                records = [j for _, _, j in done]
+
+                new_f = _reopen_if_replaced(csv_f, csv_file)
+                if new_f is not csv_f:
+                    csv_f, unsynced_rows = new_f, 0
+                    _write_csv_preamble(csv_f, CONFIG)
+                csv_f.write("".join(_csv_line(r) for _, r, _ in done))
+                csv_f.flush()
+                unsynced_rows += len(done)
+
+                # Only the newest record matters for latest_shot.json
+                _write_replace(latest_json_file, orjson.dumps(records[-1], option=_JSON_DUMP_OPTS))
+
+                # Append in place; fall back to a full rewrite only if the file is not a JSON array
+                hist_f = _reopen_if_replaced(hist_f, history_json_file, _open_json_rw)
+                hist_f = _rotate_if_large(hist_f, history_json_file, hist_max_bytes)
+                if not _append_json_array(hist_f, records):
+                    # Not a JSON array we can append to (e.g. cut off by a power loss). Keep
+                    # the unreadable file for manual repair instead of overwriting it.
+                    h = None
+                    try:
+                        with open(history_json_file, 'rb') as f: h = orjson.loads(f.read())
+                    except (OSError, orjson.JSONDecodeError): pass
+                    if not isinstance(h, list):
+                        hist_f.close()
+                        kept = _move_aside(history_json_file, "corrupt")
+                        utils.sp_print(f"History log unreadable, kept as {kept}; starting a new one", CONFIG, level="simple")
+                        hist_f = _open_json_rw(history_json_file)
+                        h = []
+                    h.extend(records)
+                    with open(history_json_file, 'wb') as f:
+                        f.write(b"[\n" + b",\n".join(orjson.dumps(x, option=_JSON_COMPACT_OPTS) for x in h) + b"\n]")
+
+                # Persist both logs together: every N rows, or once the last sync is CSV_FSYNC_MAX_SEC old
+                if unsynced_rows >= fsync_every or time.monotonic() - last_sync >= CSV_FSYNC_MAX_SEC:
+                    os.fsync(csv_f.fileno()); os.fsync(hist_f.fileno())
+                    unsynced_rows, last_sync = 0, time.monotonic()
+
+                for shot, _, _ in done:
+                    log_msg = f" [Logged]: {shot.filename} (v{CONFIG['VERSION']} / Spec v{CONFIG['JSON_SPEC']})"
+                    utils.sp_print(log_msg, CONFIG, level="simple")
+            except Exception as e:
+                utils.sp_print(f"Log write failed for {', '.join(sh.filename for sh, _, _ in done)}: {e}", CONFIG)
+            finally:
+                for _ in batch:
+                    analysis_queue.task_done()
+    finally:
+        csv_f.flush(); os.fsync(csv_f.fileno())
+        csv_f.close()
+        os.fsync(hist_f.fileno())
+        hist_f.close()
+
+def analyzer_worker(analysis_queue, stop_event, CONFIG):
+    """
+    Background worker that processes downloaded images.
+    v14.1.0: Uses pre-formatted strings (_s) from utils for CSV and 
+             pre-converted numeric values for JSON.
+    Exif parsing runs on a small pool; results go to _writer_worker in arrival order.
+    """
+    n_workers = max(1, CONFIG.get("ANALYZER_WORKERS", 2))
+    # EQUIPMENT does not change during a session: derive f-number / pixel scale once
+    f_number, pixel_scale = utils.calculate_equipment_specs(CONFIG["EQUIPMENT"])
+    csv_template = _csv_template(CONFIG, f_number, pixel_scale)
+    skeleton = _json_skeleton(CONFIG, f_number, pixel_scale)
+    pool = ThreadPoolExecutor(max_workers=n_workers, thread_name_prefix="sp03-analyzer")
+
+    # Bounded: shots parsed ahead of the writer (back-pressure onto analysis_queue)
+    write_q = utils.SPSCQueue(maxsize=WRITE_Q_MAX)
+    writer_done = threading.Event()
+    t_write = threading.Thread(target=_writer_worker,
+                               args=(write_q, analysis_queue, writer_done, CONFIG))
+    t_write.start()
+
+    try:
+        while not (stop_event.is_set() and analysis_queue.empty()):
+            try: 
+                shot = analysis_queue.get(timeout=QUEUE_IDLE_WAIT_SEC)
+            except queue.Empty: 
+                continue
+            # One task per shot: every Exif backend here runs in-process, so there is no
+            # per-invocation startup (as with an exiftool call) that batching would amortize.
+            # A backlog is drained in parallel by the pool instead.
+            write_q.put((shot, pool.submit(_analyze_shot, shot, CONFIG, csv_template, skeleton)))
+    finally:
+        writer_done.set()
+        write_q.wake()
+        t_write.join()
+        pool.shutdown(wait=True)
@@ -16,19 +16,205 @@ import sys
 import json
 import time
 import math
+import functools
+import socket
 import subprocess
+import queue
+import threading
+from collections import deque
+from xml.etree.ElementTree import XMLPullParser, ParseError
 from datetime import datetime, timezone
-from timezonefinder import TimezoneFinder
-import pytz
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
-# Instantiate as a global variable (load the database only once at startup)
-# This prevents the heavy database loading on every function call.
-_tf = TimezoneFinder()
+# TimezoneFinder loads a large polygon database, so it is created on first use
+# (print_help / load_config_file never need it) and then kept for the process.
+_tf = None
+
+def _get_tf():
+    global _tf
+    if _tf is None:
+        from timezonefinder import TimezoneFinder
+        _tf = TimezoneFinder()
+    return _tf
+
+@functools.lru_cache(maxsize=64)
+def _tz_for(lat_q, lon_q):
+    """
+    Timezone name for a position quantized to 1/1000 degree (~100 m). A fixed site
+    hits the cache on every tick instead of re-running the polygon lookup.
+    """
+    return _get_tf().timezone_at(lat=lat_q / 1e3, lng=lon_q / 1e3) or "Asia/Tokyo"
+
+@functools.lru_cache(maxsize=16)
+def _utc_offset_for(tz_name, utc_minute):
+    """
+    "+HH:MM" offset of tz_name at the given UTC minute. The offset only changes at
+    DST transitions (always on a whole minute), so ticks within a minute share one entry.
+    """
+    offset_str = datetime.fromtimestamp(utc_minute * 60, tz=timezone.utc).astimezone(ZoneInfo(tz_name)).strftime('%z')
+    return f"{offset_str[:3]}:{offset_str[3:]}"
+
+# GMST 定数 (除算は逆数の乗算にしておく)
+_INV_DAY_SEC = 1.0 / 86400.0
+_UNIX_EPOCH_J2000_DAYS = 2440587.5 - 2451545.0
+_INV_JULIAN_CENTURY = 1.0 / 36525.0
+_INV_GMST_T3 = 1.0 / 38710000.0
+
+def _lst_hours(timestamp, longitude):
+    """
+    Local Sidereal Time in decimal hours for a Unix timestamp and east longitude (deg).
+    Plain float kernel on locals; called once per telemetry tick.
+    """
+    # Julian Date calculation (valid for 1901-2099), days since J2000.0
+    d = timestamp * _INV_DAY_SEC + _UNIX_EPOCH_J2000_DAYS
+    t = d * _INV_JULIAN_CENTURY
+
+    # GMST calculation (t の項は Horner 形)。fmod で先に小さくしておき、符号は最後の % で整える
+    gmst = math.fmod(280.46061837 + 360.98564736629 * d + t * t * (0.000387933 - t * _INV_GMST_T3), 360.0)
+
+    # LST = GMST + Longitude (degrees), 15 degrees = 1 hour
+    return ((gmst + longitude) % 360.0) / 15.0
+
+# indi_getprop プロセス全体の上限 (秒)。-t 1 の通信タイムアウトより長めに取る
+_INDI_GETPROP_TIMEOUT_SEC = 2.0
+
+# Persistent INDI stream: connect timeout, wait for the initial definition burst, reconnect back-off (秒)
+_INDI_CONNECT_TIMEOUT_SEC = 1.0
+_INDI_SYNC_WAIT_SEC = 1.0
+# 最後の def*Vector からこの時間新しい定義が来なければ、初期の定義一式を受信し終えたとみなす
+_INDI_SYNC_QUIET_SEC = 0.3
+_INDI_RECONNECT_SEC = 10.0
+
+
+class _IndiStream:
+    """
+    Long-lived TCP connection to indiserver. Sends <getProperties> once and a daemon
+    thread folds every def*/set*Vector into a {"Device.Property.Element": "Value"}
+    cache, so a telemetry poll is a dict lookup instead of an indi_getprop process.
+    Keys match indi_getprop's; values are the raw element text sent by the driver
+    (e.g. RA as a plain decimal rather than indi_getprop's sexagesimal formatting).
+    <delProperty> drops the device's (or property's) entries and clears 'synced'
+    until the driver has defined its properties again.
+    """
+    _VECTOR_TAGS = ("def", "set")
+
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.cache = {}
+        self.synced = threading.Event()   # 初期の定義一式 (getProperties への応答) を受信済み
+        self._sock = None
+        self._next_try = 0.0
+        self._closed = False
+        self._lock = threading.Lock()
+
+    @property
+    def alive(self):
+        return self._sock is not None
+
+    def ensure_connected(self):
+        """Connects (or reconnects after a drop) at most once per _INDI_RECONNECT_SEC."""
+        with self._lock:
+            if self._closed or self._sock is not None or time.monotonic() < self._next_try:
+                return self._sock is not None
+            self._next_try = time.monotonic() + _INDI_RECONNECT_SEC
+            try:
+                sock = socket.create_connection((self.host, self.port), timeout=_INDI_CONNECT_TIMEOUT_SEC)
+                sock.settimeout(None)
+                sock.sendall(b'<getProperties version="1.7"/>\n')
+            except OSError:
+                return False
+            self.cache = {}
+            self.synced.clear()
+            self._sock = sock
+            threading.Thread(target=self._reader, args=(sock,), daemon=True).start()
+            return True
+
+    def _reader(self, sock):
+        # INDI はルート要素のない XML 断片の連続なので、ダミーのルートで包んでから逐次パースする
+        parser = XMLPullParser(events=("start", "end"))
+        parser.feed(b"<indi>")
+        root = None
+        cache = self.cache
+        synced = self.synced
+        last_def = None
+        # 同期までは recv にタイムアウトを付け、定義が途切れた (静かになった) ことを検出する
+        sock.settimeout(_INDI_SYNC_QUIET_SEC)
+        try:
+            while True:
+                try:
+                    data = sock.recv(65536)
+                except socket.timeout:
+                    data = None
+                if data == b"":
+                    break
+                if data:
+                    parser.feed(data)
+                    for event, elem in parser.read_events():
+                        if root is None:
+                            root = elem
+                            continue
+                        if event != "end":
+                            continue
+                        if elem.tag == "delProperty":
+                            # ドライバーの切断・再起動。古い値を最新のテレメトリとして返さないよう
+                            # 該当キーを捨て、再定義が揃うまでは indi_getprop にフォールバックさせる
+                            name = elem.get("name")
+                            gone = f"{elem.get('device')}.{name}." if name else f"{elem.get('device')}."
+                            for key in [k for k in cache if k.startswith(gone)]:
+                                del cache[key]
+                            if synced.is_set():
+                                synced.clear()
+                                sock.settimeout(_INDI_SYNC_QUIET_SEC)
+                            last_def = None
+                            root.clear()
+                            continue
+                        if not elem.tag.endswith("Vector") or elem.tag[:3] not in self._VECTOR_TAGS:
+                            continue
+                        prefix = f"{elem.get('device')}.{elem.get('name')}."
+                        for child in elem:
+                            name = child.get("name")
+                            if name is not None:
+                                cache[prefix + name] = (child.text or "").strip()
+                        if elem.tag[:3] == "def":
+                            last_def = time.monotonic()
+                        root.clear()  # 処理済みの要素を捨ててメモリを一定に保つ
+                if not synced.is_set() and last_def is not None and time.monotonic() - last_def >= _INDI_SYNC_QUIET_SEC:
+                    synced.set()
+                    sock.settimeout(None)
+        except (OSError, ParseError):
+            pass
+        finally:
+            with self._lock:
+                if self._sock is sock:
+                    self._sock = None
+            try:
+                sock.close()
+            except OSError:
+                pass
+
+    def close(self):
+        """Drops the connection for good; shutdown() also wakes the reader out of recv()."""
+        with self._lock:
+            self._closed = True
+            sock, self._sock = self._sock, None
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            sock.close()
+
+    def snapshot(self, fullprops):
+        # reader スレッドが delProperty でキーを消すことがあるため、get で1回だけ引く
+        cache = self.cache
+        return {k: v for k in fullprops if (v := cache.get(k)) is not None}
 
 
 class IndiClient:
     """
-    IndiClient handles communication with an INDI server via shell commands (indi_getprop).
+    IndiClient handles communication with an INDI server. Telemetry is read from a
+    persistent indiserver connection, or with one batched indi_getprop call per poll
+    when the server cannot be reached directly.
     It retrieves astronomical telemetry such as coordinates, pier side, 
     and environmental data.
     
@@ -44,6 +230,49 @@ class IndiClient:
             config (dict): The main configuration dictionary.
         """
         self.config = config
+        self._stream = _IndiStream(
+            self._get_config_val('INDI_HOST', 'SYSTEM', 'localhost'),
+            int(self._get_config_val('INDI_PORT', 'SYSTEM', 7624)))
+        self.refresh_config()
+
+    def refresh_config(self):
+        """
+        設定値 (デバイス名・プロパティ名・フォールバック位置) と取得キー一覧をまとめて解決しておく。
+        毎回の get_observation_data() では属性を読むだけになる。config を読み直したら呼び直すこと。
+        """
+        get = self._get_config_val
+        self._mount_dev = mount_dev = get('INDI_MOUNT', 'SYSTEM', 'LX200 OnStep')
+        self._geo_prop  = geo_prop  = get('PROP_GEO', 'SYSTEM', 'GEOGRAPHIC_COORD')
+        self._wth_dev   = wth_dev   = get('INDI_WEATHER', 'SYSTEM', mount_dev)
+        self._wth_prop  = wth_prop  = get('PROP_WEATHER', 'SYSTEM', 'WEATHER_PARAMETERS')
+        self._coord_candidates = ("EQUATORIAL_COORD", "EQUATORIAL_EOD_COORD", get('PROP_COORD', 'SYSTEM', 'EQUATORIAL_EOD_COORD'))
+        self._last_lat  = get('LAST_LATITUDE', 'SYSTEM', 34.6493)
+        self._last_lon  = get('LAST_LONGITUDE', 'SYSTEM', 135.0015)
+        self._last_elev = get('LAST_ELEVATION', 'SYSTEM', 0.0)
+        self._site_name = get('DEFAULT_SITE_NAME', 'SYSTEM', "Unknown Site")
+        # 実際に値を返した座標・ピアサイドのプロパティ。見つからなくなったら None に戻して探し直す
+        self._coord_winner = None
+        self._pier_winner = None
+
+        # 必要なプロパティ (代替候補を含む) を先に列挙し、indi_getprop 1回でまとめて取得する
+        self._mnt = mnt = lambda prop, elem: f"{mount_dev}.{prop}.{elem}"
+        self._wth = wth = lambda prop, elem: f"{wth_dev}.{prop}.{elem}"
+        wanted = [mnt(geo_prop, e) for e in ("LAT", "LATITUDE", "LONG", "LON", "ELEV", "ALT")]
+        for cp in self._coord_candidates:
+            wanted += [mnt(cp, "RA"), mnt(cp, "DEC"), mnt(cp, "STATE")]
+        wanted += [mnt("SIDE_OF_PIER", "PIER_SIDE"), mnt("TELESCOPE_PIER_SIDE", "PIER_SIDE"),
+                   mnt("WEATHER_PARAMETERS", "WEATHER_CPU_TEMPERATURE")]
+        wanted += [wth(wth_prop, "WEATHER_TEMPERATURE"), wth("ATMOSPHERE", "TEMPERATURE"),
+                   wth(wth_prop, "WEATHER_HUMIDITY"), wth("ATMOSPHERE", "HUMIDITY"),
+                   wth(wth_prop, "WEATHER_BAROMETER"), wth("ATMOSPHERE", "PRESSURE"),
+                   wth(wth_prop, "WEATHER_DEWPOINT")]
+        self._wanted = list(dict.fromkeys(wanted))
+
+    def close(self):
+        """
+        Closes the persistent indiserver connection (session end). Later polls use indi_getprop.
+        """
+        self._stream.close()
 
     def _get_config_val(self, key, section=None, default=None):
         """
@@ -56,85 +285,63 @@ class IndiClient:
         # Fallback: Try to access as a flat dictionary
         return self.config.get(key, default)
     
+    def _get_props(self, fullprops):
+        """
+        複数のINDIプロパティを1回の indi_getprop 呼び出しでまとめて取得する。
+        
+        Args:
+            fullprops (list): "Device.Property.Element" 形式の文字列リスト
+        Returns:
+            dict: {"Device.Property.Element": "Value"} (取得できた項目のみ)
+        """
+        if not fullprops: return {}
+        # indiserver へ常時接続でき、初期の定義一式が揃っていればキャッシュから返す。
+        # 繋がらない間や定義の受信途中は indi_getprop にフォールバック (起動直後に欠けたスナップショットを返さない)
+        stream = self._stream
+        if stream.ensure_connected() and stream.synced.wait(_INDI_SYNC_WAIT_SEC):
+            return stream.snapshot(fullprops)
+        try:
+            # 見つからない項目があると終了コードが非0になるため、check せず出力だけを読む
+            # indi_getprop 自身の -t に加え、サーバー無応答で固まった場合に備えてプロセス側にも上限を設ける
+            result = subprocess.run(
+                ["indi_getprop", "-t", "1", *fullprops],
+                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                text=True, timeout=_INDI_GETPROP_TIMEOUT_SEC
+            ).stdout
+        except (subprocess.SubprocessError, OSError):
+            return {}
+
+        values = {}
+        # 各行は "Device.Property.Element=Value" の形式
+        for line in result.splitlines():
+            key, sep, val = line.partition('=')
+            if sep: values[key.strip()] = val.strip()
+        return values
+
     def _get_prop(self, device, property_name, element_name):
         """
         INDIプロパティを取得する基本メソッド。
         """
         full_prop = f"{device}.{property_name}.{element_name}"
-        try:
-            # タイムアウトを1秒に設定し、外部コマンドを実行
-            result = subprocess.check_output(
-                ["indi_getprop", "-t", "1", full_prop], 
-                stderr=subprocess.DEVNULL
-            ).decode().strip()
-            
-            # 取得結果が "Device.Property.Element=Value" の形式であることを確認
-            if "=" in result:
-                return result.split('=')[1].strip()
-        except:
-            return None
-        return None
+        return self._get_props([full_prop]).get(full_prop)
 
     def _calc_lst(self, longitude, dt_utc):
         """
         Calculates Local Sidereal Time (LST) in decimal hours.
         """
-        # Julian Date calculation (valid for 1901-2099)
-        timestamp = dt_utc.timestamp()
-        jd = (timestamp / 86400.0) + 2440587.5
-        
-        # GMST calculation
-        t = (jd - 2451545.0) / 36525.0
-        gmst = 280.46061837 + 360.98564736629 * (jd - 2451545.0) + 0.000387933 * t**2 - (t**3 / 38710000)
-        gmst = gmst % 360.0
-        
-        # LST = GMST + Longitude (degrees)
-        lst_deg = (gmst + longitude) % 360.0
-        
-        # Convert degrees to hours (15 degrees = 1 hour)
-        return lst_deg / 15.0
+        return _lst_hours(dt_utc.timestamp(), longitude)
 
     def _to_hms(self, val):
         """
         Converts a decimal hour value to a formatted HHhMMmSSs string.
         """
-        if val is None: return "00h00m00s"
-        try:
-            val = float(val) % 24
-            h = int(val)
-            m = int((val - h) * 60)
-            s = int(round((((val - h) * 60) - m) * 60))
-            if s >= 60:
-                s -= 60
-                m += 1
-            if m >= 60:
-                m -= 60
-                h = (h + 1) % 24
-            return f"{h:02d}h{m:02d}m{s:02d}s"
-        except: 
-            return "00h00m00s"
+        return _hms_or_zero(val, 3600)
 
     def _to_dms(self, val):
         """
         Converts a decimal degree value to a formatted +DD°MM'SS" string.
         """
-        if val is None: return "+00°00'00\""
-        try:
-            val = float(val)
-            sign = "-" if val < 0 else "+"
-            val = abs(val)
-            d = int(val)
-            m = int((val - d) * 60)
-            s = int(round((((val - d) * 60) - m) * 60))
-            if s >= 60:
-                s -= 60
-                m += 1
-            if m >= 60:
-                m -= 60
-                d += 1
-            return f"{sign}{d:02d}°{m:02d}'{s:02d}\""
-        except: 
-            return "+00°00'00\""
+        return deg_to_dms(val)
 
     def _parse_sexagesimal(self, val):
         """
@@ -142,129 +349,139 @@ class IndiClient:
         """
         if val is None: return None
         try:
-            if isinstance(val, (int, float)): return float(val)
-            parts = str(val).split(':')
-            if len(parts) < 2: return float(val)
+            # INDI からはほぼ常に str が来るので、その場合は str() も isinstance も通さない
+            if val.__class__ is str:
+                text = val
+            elif isinstance(val, (int, float)):
+                return float(val)
+            else:
+                text = str(val)
+            # split のリスト生成の代わりに partition で先頭から3フィールドだけ切り出す (4つ目以降は無視)
+            d_str, sep, rest = text.partition(':')
+            if not sep: return float(val)
+            m_str, sep, rest = rest.partition(':')
             
-            d = float(parts[0])
-            m = float(parts[1])
-            s = float(parts[2]) if len(parts) > 2 else 0.0
+            d = float(d_str)
+            m = float(m_str)
+            s = float(rest.partition(':')[0]) if sep else 0.0
             
-            sign = -1 if d < 0 or parts[0].startswith('-') else 1
+            sign = -1 if d < 0 or d_str.startswith('-') else 1
             return d + (sign * m / 60.0) + (sign * s / 3600.0)
-        except:
+        except (TypeError, ValueError):
             return None
 
-    def get_observation_data(self):
+    def fetch_props(self):
+        """
+        get_observation_data() が参照する INDI プロパティ一式を取得して返します。
+        別スレッドで定期取得したスナップショットを get_observation_data(props=...) に渡せます。
+        """
+        return self._get_props(self._wanted)
+
+    def get_observation_data(self, now_utc=None, props=None):
         """
         INDIサーバーからテレメトリを取得し、JSON Spec v1.4.0準拠のデータを生成します。
         Logger(CSV)用の整形済み文字列 (_s) も同時に生成して返します。
+        now_utc を渡すと、その時刻で LST・UTCオフセットを計算します (撮影時刻との時刻ずれ防止)。
+        props に fetch_props() の結果を渡すと、INDIへの問い合わせを省略してそれを使います。
         """
-        # --- 1. 設定の取得 ---
-        mount_dev = self._get_config_val('INDI_MOUNT', 'SYSTEM', 'LX200 OnStep')
-        geo_prop  = self._get_config_val('PROP_GEO', 'SYSTEM', 'GEOGRAPHIC_COORD')
-        wth_dev   = self._get_config_val('INDI_WEATHER', 'SYSTEM', mount_dev)
-        wth_prop  = self._get_config_val('PROP_WEATHER', 'SYSTEM', 'WEATHER_PARAMETERS')
-
-        # --- 2. 内部ヘルパー: 数値化と整形済み文字列の生成 ---
-        def _fmt(val, prec):
-            v = to_float_or_none(val)
-            s = f"{v:.{prec}f}" if v is not None else ""
-            return v, s
-
-        # --- 3. INDIからのデータ取得 ---
-        lat_raw = self._get_prop(mount_dev, geo_prop, "LAT") or self._get_prop(mount_dev, geo_prop, "LATITUDE")
-        lon_raw = self._get_prop(mount_dev, geo_prop, "LONG") or self._get_prop(mount_dev, geo_prop, "LON")
-        alt_raw = self._get_prop(mount_dev, geo_prop, "ELEV") or self._get_prop(mount_dev, geo_prop, "ALT")
-
-        coord_candidates = ["EQUATORIAL_COORD", "EQUATORIAL_EOD_COORD", self._get_config_val('PROP_COORD', 'SYSTEM', 'EQUATORIAL_EOD_COORD')]
+        # --- 1. 設定の取得 (refresh_config() で解決済み) ---
+        geo_prop, wth_prop = self._geo_prop, self._wth_prop
+
+        # --- 2. INDIからのデータ取得 ---
+        coord_candidates = self._coord_candidates
+        mnt, wth = self._mnt, self._wth
+        if props is None:
+            props = self.fetch_props()
+
+        lat_raw = props.get(mnt(geo_prop, "LAT")) or props.get(mnt(geo_prop, "LATITUDE"))
+        lon_raw = props.get(mnt(geo_prop, "LONG")) or props.get(mnt(geo_prop, "LON"))
+        alt_raw = props.get(mnt(geo_prop, "ELEV")) or props.get(mnt(geo_prop, "ALT"))
+
         ra_raw, dec_raw, status = None, None, "Unknown"
 
-        for cp in coord_candidates:
-            ra_val = self._get_prop(mount_dev, cp, "RA")
-            if ra_val:
-                ra_raw = ra_val
-                dec_raw = self._get_prop(mount_dev, cp, "DEC")
-                status = self._get_prop(mount_dev, cp, "STATE") or "Idle"
-                break
+        # マウントが公開するのは通常どれか1つなので、前回当たった候補を先に見る
+        cp = self._coord_winner
+        if not (cp and props.get(mnt(cp, "RA"))):
+            cp = self._coord_winner = next((c for c in coord_candidates if props.get(mnt(c, "RA"))), None)
+        if cp:
+            ra_raw = props.get(mnt(cp, "RA"))
+            dec_raw = props.get(mnt(cp, "DEC"))
+            status = props.get(mnt(cp, "STATE")) or "Idle"
 
-        # --- 4. 座標・時間・LST計算 ---
+        # --- 3. 座標・時間・LST計算 ---
         try:
             latitude = float(lat_raw)
             longitude = float(lon_raw)
             tz_source = "gps"
-        except:
-            latitude = float(self._get_config_val('LAST_LATITUDE', 'SYSTEM', 34.6493))
-            longitude = float(self._get_config_val('LAST_LONGITUDE', 'SYSTEM', 135.0015))
+        except (TypeError, ValueError):
+            latitude = float(self._last_lat)
+            longitude = float(self._last_lon)
             tz_source = "last_known"
 
-        elevation = to_float_or_none(alt_raw) or float(self._get_config_val('LAST_ELEVATION', 'SYSTEM', 0.0))
+        elevation = to_float_or_none(alt_raw) or float(self._last_elev)
 
         try:
-            timezone_name = _tf.timezone_at(lat=latitude, lng=longitude) or "Asia/Tokyo"
-        except:
+            timezone_name = _tz_for(round(latitude * 1000), round(longitude * 1000))
+        except (ValueError, OverflowError):
             timezone_name = "Asia/Tokyo"
             
-        now_utc = datetime.now(timezone.utc)
+        if now_utc is None:
+            now_utc = datetime.now(timezone.utc)
         
         try:
-            tz_obj = pytz.timezone(timezone_name)
-            now_tz = now_utc.astimezone(tz_obj)
-            offset_str = now_tz.strftime('%z')
-            utc_offset = f"{offset_str[:3]}:{offset_str[3:]}"
-        except:
+            utc_offset = _utc_offset_for(timezone_name, int(now_utc.timestamp()) // 60)
+        except (ZoneInfoNotFoundError, ValueError):
             utc_offset = "+09:00"
 
         lst_val = self._calc_lst(longitude, now_utc)
-        meridian_side = self._get_prop(mount_dev, "SIDE_OF_PIER", "PIER_SIDE") or \
-                        self._get_prop(mount_dev, "TELESCOPE_PIER_SIDE", "PIER_SIDE") or "Unknown"
+        pp = self._pier_winner
+        if not (pp and props.get(mnt(pp, "PIER_SIDE"))):
+            pp = self._pier_winner = next((c for c in ("SIDE_OF_PIER", "TELESCOPE_PIER_SIDE") if props.get(mnt(c, "PIER_SIDE"))), None)
+        meridian_side = props.get(mnt(pp, "PIER_SIDE")) if pp else "Unknown"
 
-        # --- 5. RA/DEC 変換と時角計算 (桁合わせ含む) ---
+        # --- 4. RA/DEC 変換と時角計算 (桁合わせ含む) ---
         ra_deg, dec_deg, hour_angle = None, None, None
+        # _parse_sexagesimal は変換できない値に None を返すので、ここでは例外を捕まえない
         if ra_raw:
-            try:
-                r_val = self._parse_sexagesimal(ra_raw)
-                if r_val is not None:
-                    ra_deg = r_val * 15.0
-                    ha_val = lst_val - r_val
-                    if ha_val > 12: ha_val -= 24
-                    if ha_val < -12: ha_val += 24
-                    hour_angle = ha_val
-                    if meridian_side == "Unknown":
-                        meridian_side = "East" if ha_val < 0 else "West"
-            except: pass
+            r_val = self._parse_sexagesimal(ra_raw)
+            if r_val is not None:
+                ra_deg = r_val * 15.0
+                ha_val = lst_val - r_val
+                if ha_val > 12: ha_val -= 24
+                if ha_val < -12: ha_val += 24
+                hour_angle = ha_val
+                if meridian_side == "Unknown":
+                    meridian_side = "East" if ha_val < 0 else "West"
         
         if dec_raw:
-            try:
-                dec_deg = self._parse_sexagesimal(dec_raw)
-            except: pass
+            dec_deg = self._parse_sexagesimal(dec_raw)
 
         # 整形済みデータの生成
-        lat_v, lat_s = _fmt(latitude, 6)
-        lon_v, lon_s = _fmt(longitude, 6)
-        elv_v, elv_s = _fmt(elevation, 1)
-        ra_deg_v, ra_deg_s = _fmt(ra_deg, 6)
-        dec_deg_v, dec_deg_s = _fmt(dec_deg, 6)
-        ha_v, ha_s = _fmt(hour_angle, 4)
-
-        w_temp_v, w_temp_s = _fmt(self._get_prop(wth_dev, wth_prop, "WEATHER_TEMPERATURE") or self._get_prop(wth_dev, "ATMOSPHERE", "TEMPERATURE"), 1)
-        w_humi_v, w_humi_s = _fmt(self._get_prop(wth_dev, wth_prop, "WEATHER_HUMIDITY") or self._get_prop(wth_dev, "ATMOSPHERE", "HUMIDITY"), 1)
-        w_pres_v, w_pres_s = _fmt(self._get_prop(wth_dev, wth_prop, "WEATHER_BAROMETER") or self._get_prop(wth_dev, "ATMOSPHERE", "PRESSURE"), 1)
-        w_dew_v,  w_dew_s  = _fmt(self._get_prop(wth_dev, wth_prop, "WEATHER_DEWPOINT"), 1)
+        lat_v, lat_s = _fmt_decimal(latitude, 6)
+        lon_v, lon_s = _fmt_decimal(longitude, 6)
+        elv_v, elv_s = _fmt_decimal(elevation, 1)
+        ra_deg_v, ra_deg_s = _fmt_decimal(ra_deg, 6)
+        dec_deg_v, dec_deg_s = _fmt_decimal(dec_deg, 6)
+        ha_v, ha_s = _fmt_decimal(hour_angle, 4)
+
+        w_temp_v, w_temp_s = _fmt_decimal(props.get(wth(wth_prop, "WEATHER_TEMPERATURE")) or props.get(wth("ATMOSPHERE", "TEMPERATURE")), 1)
+        w_humi_v, w_humi_s = _fmt_decimal(props.get(wth(wth_prop, "WEATHER_HUMIDITY")) or props.get(wth("ATMOSPHERE", "HUMIDITY")), 1)
+        w_pres_v, w_pres_s = _fmt_decimal(props.get(wth(wth_prop, "WEATHER_BAROMETER")) or props.get(wth("ATMOSPHERE", "PRESSURE")), 1)
+        w_dew_v,  w_dew_s  = _fmt_decimal(props.get(wth(wth_prop, "WEATHER_DEWPOINT")), 1)
         
         # INDI (OnStep等) 側の温度取得
-        cpu_mount_raw = self._get_prop(mount_dev, "WEATHER_PARAMETERS", "WEATHER_CPU_TEMPERATURE")
-        cpu_mount_v, cpu_mount_s = _fmt(cpu_mount_raw, 1)
+        cpu_mount_raw = props.get(mnt("WEATHER_PARAMETERS", "WEATHER_CPU_TEMPERATURE"))
+        cpu_mount_v, cpu_mount_s = _fmt_decimal(cpu_mount_raw, 1)
         
-        cpu_rpi_v,    cpu_rpi_s    = _fmt(get_cpu_temp() if 'get_cpu_temp' in globals() else None, 1)
+        cpu_rpi_v,    cpu_rpi_s    = _fmt_decimal(get_cpu_temp() if 'get_cpu_temp' in globals() else None, 1)
 
-        # --- 6. 結果辞書の構築 ---
+        # --- 5. 結果辞書の構築 ---
         return {
             "latitude": lat_v, "latitude_s": lat_s,
             "longitude": lon_v, "longitude_s": lon_s,
             "elevation": elv_v, "elevation_s": elv_s,
             "timezone": timezone_name, "utc_offset": utc_offset, "tz_source": tz_source,
-            "site_name": self._get_config_val('DEFAULT_SITE_NAME', 'SYSTEM', "Unknown Site"),
+            "site_name": self._site_name,
             
             "ra_raw_val": ra_raw,
             "dec_raw_val": dec_raw,
@@ -289,11 +506,17 @@ class IndiClient:
 
 # --- Standalone Helper Functions (Original Implementation) ---
 
+_CPU_TEMP_PATH = "/sys/class/thermal/thermal_zone0/temp"
+_cpu_temp_fd = None
+
 def get_cpu_temp():
+    # sysfs の値はオフセット0からの pread で毎回読み直せるので、fd は開いたままにする
+    global _cpu_temp_fd
     try:
-        with open("/sys/class/thermal/thermal_zone0/temp", "r") as f:
-            return float(f.read()) / 1000.0
-    except:
+        if _cpu_temp_fd is None:
+            _cpu_temp_fd = os.open(_CPU_TEMP_PATH, os.O_RDONLY)
+        return int(os.pread(_cpu_temp_fd, 16, 0)) / 1000.0
+    except (OSError, ValueError):
         return None
 
 def sp_print(message, config, level="full"):
@@ -343,14 +566,17 @@ def load_config_file(base_config):
             with open(config_path, 'r', encoding='utf-8') as f:
                 ext_conf = json.load(f)
             if "SYSTEM" in ext_conf:
+                # 入れ子の SYSTEM 辞書 (ある場合) はループの外で1回だけ解決する
+                sys_base = base_config.get('SYSTEM')
+                if not isinstance(sys_base, dict): sys_base = None
                 for k, v in ext_conf["SYSTEM"].items():
-                    if k in base_config: base_config[k] = v
-                    elif 'SYSTEM' in base_config and isinstance(base_config['SYSTEM'], dict):
-                        base_config['SYSTEM'][k] = v
-                    if k == "SAVE_DIR":
-                         if k in base_config: base_config[k] = os.path.expanduser(v)
-                         if 'SYSTEM' in base_config and isinstance(base_config['SYSTEM'], dict):
-                             base_config['SYSTEM'][k] = os.path.expanduser(v)
+                    if k == "SAVE_DIR": v = os.path.expanduser(v)
+                    if k in base_config:
+                        base_config[k] = v
+                        # SAVE_DIR はフラット側と SYSTEM 側の両方に反映する
+                        if k == "SAVE_DIR" and sys_base is not None: sys_base[k] = v
+                    elif sys_base is not None:
+                        sys_base[k] = v
             if "CONTEXT" in ext_conf and "CONTEXT" in base_config:
                 base_config["CONTEXT"].update(ext_conf["CONTEXT"])
             if "EQUIPMENT" in ext_conf and "EQUIPMENT" in base_config:
@@ -365,46 +591,40 @@ def load_config_file(base_config):
 
 # --- Common Utilities (Legacy Support) ---
 
-def deg_to_hms(val):
+# 丸めは整数の秒 (角秒) 単位で1回だけ行い、divmod で分解する。60秒/60分への繰り上がり補正が不要になる
+def _hms_from_seconds(total):
+    h, rem = divmod(int(total) % 86400, 3600)
+    m, s = divmod(rem, 60)
+    return f"{h:02d}h{m:02d}m{s:02d}s"
+
+def _dms_from_degrees(val):
+    d, rem = divmod(round(abs(val) * 3600), 3600)
+    m, s = divmod(rem, 60)
+    return f"{'-' if val < 0 else '+'}{d:02d}°{m:02d}'{s:02d}\""
+
+def _hms_or_zero(val, sec_per_unit):
+    # 時・度どちらの入力も秒に換算してから同じ整形を通す。変換できない値は 00h00m00s
     if val is None: return "00h00m00s"
     try:
-        val = (float(val) / 15.0) % 24
-        h = int(val)
-        m = int((val - h) * 60)
-        s = int(round((((val - h) * 60) - m) * 60))
-        if s >= 60:
-            s -= 60
-            m += 1
-        if m >= 60:
-            m -= 60
-            h = (h + 1) % 24
-        return f"{h:02d}h{m:02d}m{s:02d}s"
-    except: return "00h00m00s"
+        return _hms_from_seconds(round(float(val) * sec_per_unit))
+    except (TypeError, ValueError, OverflowError): return "00h00m00s"
+
+def deg_to_hms(val):
+    # 1° = 240 s (時間)
+    return _hms_or_zero(val, 240)
 
 def deg_to_dms(val):
     if val is None: return "+00°00'00\""
     try:
-        val = float(val)
-        sign = "-" if val < 0 else "+"
-        val = abs(val)
-        d = int(val)
-        m = int((val - d) * 60)
-        s = int(round((((val - d) * 60) - m) * 60))
-        if s >= 60:
-            s -= 60
-            m += 1
-        if m >= 60:
-            m -= 60
-            d += 1
-        return f"{sign}{d:02d}°{m:02d}'{s:02d}\""
-    except: return "+00°00'00\""
+        return _dms_from_degrees(float(val))
+    except (TypeError, ValueError, OverflowError): return "+00°00'00\""
 
 def calculate_exposure_diff(actual_ms, exif_exp_tag):
     try:
         actual_sec = float(actual_ms) / 1000.0
         exif_sec = float(exif_exp_tag.values[0].num) / float(exif_exp_tag.values[0].den) if exif_exp_tag else actual_sec
         return round(actual_sec - exif_sec, 6)
-    except: return 0.0
+    except (AttributeError, IndexError, TypeError, ValueError, ZeroDivisionError): return 0.0
 
 def calculate_equipment_specs(eq_config):
     try:
@@ -414,8 +634,96 @@ def calculate_equipment_specs(eq_config):
         f_num = round(f_len / aper, 1) if aper > 0 else None
         pix_scale = round((pix_size * 206.265) / f_len, 2) if f_len > 0 else None
         return f_num, pix_scale
-    except: return None, None
+    except (AttributeError, TypeError, ValueError): return None, None
 
 def to_float_or_none(val):
+    # INDI の未設定値 (None / 空文字) は例外を経由せずに返す
+    if val is None or val == "": return None
     try: return float(val)
     except (TypeError, ValueError): return None
+
+# 使う精度ごとの書式指定を前もって作っておく (未登録の精度はその場で生成)
+_FMT_CACHE = {p: f".{p}f" for p in (1, 2, 4, 6)}
+
+def _fmt_decimal(val, prec, _to_float=to_float_or_none, _specs=_FMT_CACHE):
+    """
+    Returns (float or None, fixed-point string or "") for a telemetry value.
+    The helpers are bound as defaults so a call does no global lookups.
+    """
+    v = _to_float(val)
+    if v is None: return None, ""
+    return v, format(v, _specs.get(prec) or f".{prec}f")
+
+
+class SPSCQueue:
+    """
+    Single-producer / single-consumer hand-off queue for the worker threads.
+    deque.append/popleft are atomic under the GIL, so no lock is taken per item;
+    an Event wakes the consumer. Implements the queue.Queue subset used here
+    (put(timeout), get(timeout), empty, task_done, join). With maxsize > 0, put()
+    blocks while the queue is full and raises queue.Full after the timeout.
+    Only for queues with exactly one putting thread and one getting thread; use
+    queue.Queue where several threads put (e.g. the download queue, which the
+    fetch thread re-fills on a failed download).
+    """
+    def __init__(self, maxsize=0):
+        self.maxsize = maxsize
+        self._items = deque()
+        self._unfinished = 0        # put() calls not yet task_done()
+        self._done_cv = threading.Condition()
+        self._ready = threading.Event()
+        self._not_full = threading.Event()
+        self._not_full.set()
+        self._woken = False
+
+    def put(self, item, timeout=None):
+        if self.maxsize > 0 and len(self._items) >= self.maxsize:
+            self._not_full.clear()
+            # Re-check after clear() so a get() in between is not missed
+            if len(self._items) >= self.maxsize and not self._not_full.wait(timeout):
+                raise queue.Full
+        with self._done_cv:
+            self._unfinished += 1
+        self._items.append(item)
+        self._ready.set()
+
+    def get(self, timeout=None):
+        try:
+            item = self._items.popleft()
+        except IndexError:
+            self._ready.clear()
+            # Re-check after clear() so a put() between popleft and clear is not missed;
+            # after wake() an empty queue returns at once instead of waiting
+            if not self._items and (self._woken or not self._ready.wait(timeout)):
+                raise queue.Empty
+            try:
+                item = self._items.popleft()
+            except IndexError:
+                raise queue.Empty
+        self._not_full.set()
+        return item
+
+    def empty(self):
+        return not self._items
+
+    def wake(self):
+        """
+        Wakes a blocked get() so the consumer re-checks its stop condition (shutdown).
+        Sticky: later get() calls on an empty queue raise queue.Empty immediately, so a
+        wake that lands between the consumer's stop check and its wait is not lost.
+        """
+        self._woken = True
+        self._ready.set()
+
+    def task_done(self):
+        with self._done_cv:
+            if self._unfinished <= 0:
+                raise ValueError("task_done() called too many times")
+            self._unfinished -= 1
+            if not self._unfinished:
+                self._done_cv.notify_all()
+
+    def join(self):
+        with self._done_cv:
+            while self._unfinished:
+                self._done_cv.wait()
\ No newline at end of file